@@ -1,9 +1,15 @@
 import streamlit as st
 from utils import load_image
-from vision_model import describe_image
+from vision_model import get_model
 from analyzer import analyze_ad
 
 st.set_page_config(page_title="Ad Analyzer AI", layout="centered")
+
+@st.cache_resource(show_spinner="Cargando el modelo de visión...")
+def load_vision_model():
+    # Loaded on the first analysis and shared by every session.
+    return get_model()
+
 st.title("AI Advertising Analyzer")
 st.markdown("Sube una imagen de un anuncio y la IA lo analizará.")
 
@@ -13,7 +19,7 @@ if uploaded_file:
     st.image(uploaded_file, caption="Anuncio cargado", use_column_width=True)
     
     image = load_image(uploaded_file)
-    label, results = describe_image(image)
+    label, results = load_vision_model().describe_image(image)
 
     st.markdown(f"### Descripción automática:")
     st.write(f"La IA describe la imagen como: **{label}**")
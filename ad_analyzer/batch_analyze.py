@@ -0,0 +1,247 @@
+"""
+Scores every ad image in a folder.
+
+    list images -> decode + resize (thread pool) -> CLIP in batches -> analyze_ad (bounded
+    concurrency) -> rows appended to the output as they finish
+
+Images already in the output are skipped, so an interrupted run resumes where it stopped
+(rows with an error are removed from the output and retried). The output is a CSV file, or a directory of Parquet parts
+when it ends with .parquet (needs pyarrow). Images/s for every stage are printed at the end.
+
+Usage:
+    python batch_analyze.py campaign_images/ --output scores.csv
+    python batch_analyze.py campaign_images/ --output scores.parquet --skip-analysis
+"""
+import os
+import csv
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from utils import load_image
+import vision_model
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CLIP_INPUT_SIZE = 224      # Images are decoded no larger than CLIP's input needs
+BATCH_SIZE = 32            # Images per CLIP forward pass
+DECODE_WORKERS = os.cpu_count() or 4
+ANALYZE_CONCURRENCY = 8    # analyze_ad (OpenAI) calls in flight
+FIELDS = ["path", "label", "scores", "analysis", "error"]
+
+def iter_images(folder):
+    """Yields the image paths under folder, in a stable order, without listing them all first."""
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for file in sorted(files):
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, file)
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class StageStats:
+    """Images and busy seconds per stage; images/s = images / busy seconds * workers."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.images = {stage: 0 for stage in workers}
+        self.busy = {stage: 0.0 for stage in workers}
+        self._lock = threading.Lock()
+
+    def add(self, stage, images, seconds):
+        with self._lock:
+            self.images[stage] += images
+            self.busy[stage] += seconds
+
+    def report(self, elapsed, done):
+        lines = [f"{done} images in {elapsed:.1f}s ({done / max(elapsed, 1e-9):.1f} images/s end to end)"]
+        for stage, workers in self.workers.items():
+            busy = self.busy[stage]
+            rate = self.images[stage] / busy * workers if busy else float("nan")
+            lines.append(f"  {stage:<8} {self.images[stage]:>7} images  {busy:>8.1f}s busy x {workers} workers  {rate:>8.1f} images/s")
+        return "\n".join(lines)
+
+class CsvResults:
+    def __init__(self, path):
+        self.path = path
+
+    def done_paths(self):
+        """Paths scored without an error. Rows with an error are dropped, so retries do not duplicate them."""
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, newline="", encoding="utf-8") as f:
+            rows = csv.DictReader(f)
+            done, failed = set(), 0
+            for row in rows:
+                if row["error"]:
+                    failed += 1
+                else:
+                    done.add(row["path"])
+        if failed:
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            with open(self.path, newline="", encoding="utf-8") as f, \
+                    open(tmp_path, "w", newline="", encoding="utf-8") as out:
+                writer = csv.DictWriter(out, fieldnames=FIELDS)
+                writer.writeheader()
+                writer.writerows(row for row in csv.DictReader(f) if not row["error"])
+            os.replace(tmp_path, self.path)
+        return done
+
+    def __enter__(self):
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        if new:
+            self._writer.writeheader()
+        return self
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()  # Written rows survive an interruption
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+class ParquetResults:
+    """A directory of Parquet parts; every run appends row groups to a new part."""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.schema = pa.schema([(field, pa.string()) for field in FIELDS])
+
+    def done_paths(self):
+        """Paths scored without an error. Parts with error rows are rewritten without them."""
+        if not os.path.isdir(self.path):
+            return set()
+        done = set()
+        for file in sorted(os.listdir(self.path)):
+            if not file.endswith(".parquet"):
+                continue
+            part = os.path.join(self.path, file)
+            table = self.pq.read_table(part, columns=["path", "error"])
+            ok = [not e for e in table["error"].to_pylist()]
+            done.update(p for p, keep in zip(table["path"].to_pylist(), ok) if keep)
+            if all(ok):
+                continue
+            kept = self.pq.read_table(part).filter(self.pa.array(ok))
+            if kept.num_rows:
+                tmp_path = f"{part}.tmp-{os.getpid()}"
+                self.pq.write_table(kept, tmp_path)
+                os.replace(tmp_path, part)
+            else:
+                os.remove(part)
+        return done
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        part = os.path.join(self.path, f"part-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.parquet")
+        self._writer = self.pq.ParquetWriter(part, self.schema)
+        return self
+
+    def write(self, rows):
+        self._writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def __exit__(self, *exc):
+        self._writer.close()
+
+def decode(path):
+    start = time.perf_counter()
+    try:
+        image, error = load_image(path, min_side=CLIP_INPUT_SIZE), ""
+    except Exception as e:
+        image, error = None, f"decode: {e}"
+    return path, image, error, time.perf_counter() - start
+
+def analyze(row, stats):
+    from analyzer import analyze_ad
+    start = time.perf_counter()
+    try:
+        row["analysis"] = analyze_ad(row["label"], json.loads(row["scores"]))
+    except Exception as e:
+        row["error"] = f"analyze: {e}"
+    stats.add("analyze", 1, time.perf_counter() - start)
+    return row
+
+def run(folder, results, batch_size=BATCH_SIZE, decode_workers=DECODE_WORKERS,
+        analyze_concurrency=ANALYZE_CONCURRENCY, skip_analysis=False):
+    done = results.done_paths()
+    todo = (path for path in iter_images(folder) if path not in done)
+    stats = StageStats({"decode": decode_workers, "clip": 1, "analyze": 0 if skip_analysis else analyze_concurrency})
+    written = 0
+    start = time.perf_counter()
+    print(f"Skipping {len(done)} images already in the output.")
+
+    with ThreadPoolExecutor(decode_workers) as decode_pool, \
+            ThreadPoolExecutor(max(1, analyze_concurrency)) as analyze_pool, results:
+        pending = deque()  # analyze_ad futures, written in submission order
+
+        def write_finished(limit):
+            nonlocal written
+            rows = []
+            while pending and (len(pending) > limit or pending[0].done()):
+                rows.append(pending.popleft().result())
+            if rows:
+                results.write(rows)
+                written += len(rows)
+
+        batches = batched(todo, batch_size)
+        next_batch = [decode_pool.submit(decode, path) for path in next(batches, [])]
+        while next_batch:
+            decoded = [future.result() for future in next_batch]
+            # Decode the following batch while CLIP runs on this one.
+            next_batch = [decode_pool.submit(decode, path) for path in next(batches, [])]
+            for *_, seconds in decoded:
+                stats.add("decode", 1, seconds)
+
+            rows = [{"path": path, "label": "", "scores": "", "analysis": "", "error": error}
+                    for path, _, error, _ in decoded]
+            images = [image for _, image, _, _ in decoded if image is not None]
+            if images:
+                clip_start = time.perf_counter()
+                embeddings = iter(vision_model.embed_images(images))
+                for row, (_, image, _, _) in zip(rows, decoded):
+                    if image is not None:
+                        label, scores = vision_model.describe_embedding(next(embeddings))
+                        row["label"], row["scores"] = label, json.dumps(scores, ensure_ascii=False)
+                stats.add("clip", len(images), time.perf_counter() - clip_start)
+
+            if skip_analysis:
+                results.write(rows)
+                written += len(rows)
+                continue
+            for row in rows:
+                if row["error"]:
+                    failed = Future()
+                    failed.set_result(row)
+                    pending.append(failed)
+                else:
+                    pending.append(analyze_pool.submit(analyze, row, stats))
+            write_finished(limit=analyze_concurrency * 2)  # Bounds the rows held in memory
+        write_finished(limit=0)
+
+    print(stats.report(time.perf_counter() - start, written))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scores every ad image in a folder with CLIP and the ad analyzer.")
+    parser.add_argument("folder")
+    parser.add_argument("--output", default="ad_scores.csv", help="CSV file, or a directory ending in .parquet.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--decode-workers", type=int, default=DECODE_WORKERS)
+    parser.add_argument("--analyze-concurrency", type=int, default=ANALYZE_CONCURRENCY)
+    parser.add_argument("--skip-analysis", action="store_true", help="Only run CLIP (no OpenAI calls).")
+    args = parser.parse_args()
+
+    results = ParquetResults(args.output) if args.output.endswith(".parquet") else CsvResults(args.output)
+    run(args.folder, results, args.batch_size, args.decode_workers, args.analyze_concurrency, args.skip_analysis)
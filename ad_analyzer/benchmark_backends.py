@@ -0,0 +1,105 @@
+"""
+Compares the CLIP backends of vision_model: load time, peak memory, per-image and batched
+latency, and how often each backend's top label agrees with the fp32 torch backend.
+
+Every backend runs in its own process so the memory numbers do not mix. Without --images,
+random noise images are used (fine for latency, meaningless for agreement).
+
+Usage:
+    python benchmark_backends.py --images sample_ads/ --limit 200
+    python benchmark_backends.py --backends torch,int8
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+import numpy as np
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def load_images(folder, limit):
+    from PIL import Image
+    from utils import load_image
+    from batch_analyze import iter_images
+    if folder:
+        paths = [path for _, path in zip(range(limit), iter_images(folder))]
+        return paths, [load_image(path) for path in paths]
+    rng = np.random.default_rng(0)
+    images = [Image.fromarray(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)) for _ in range(limit)]
+    return [f"noise-{i}" for i in range(limit)], images
+
+def run_backend(backend, folder, limit, batch_size):
+    """Runs in a child process; returns the measurements as a dict."""
+    from vision_model import ClipModel
+    names, images = load_images(folder, limit)
+    baseline_mb = peak_rss_mb()
+
+    start = time.perf_counter()
+    model = ClipModel(backend=backend, image_cache_size=0)  # No cache: every call runs the model
+    load_seconds = time.perf_counter() - start
+    model.describe_image(images[0])  # Warm-up
+
+    latencies, top_labels = [], []
+    for image in images:
+        start = time.perf_counter()
+        label, _ = model.describe_image(image)
+        latencies.append(time.perf_counter() - start)
+        top_labels.append(label)
+
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        model.embed_images(images[i:i + batch_size])
+    batch_seconds = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "backend": backend,
+        "load_s": load_seconds,
+        "peak_mb": peak_rss_mb() - baseline_mb,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "batch_images_s": len(images) / batch_seconds,
+        "top_labels": dict(zip(names, top_labels))
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the CLIP inference backends.")
+    parser.add_argument("--images", help="Folder of images; random images when omitted.")
+    parser.add_argument("--limit", type=int, default=100, help="Images to use.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--backends", default="torch,int8,onnx")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)  # Internal: run one backend and print JSON
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.images, args.limit, args.batch_size)))
+        sys.exit(0)
+
+    results = []
+    for backend in args.backends.split(","):
+        command = [sys.executable, os.path.abspath(__file__), "--worker", backend,
+                   "--limit", str(args.limit), "--batch-size", str(args.batch_size)]
+        if args.images:
+            command += ["--images", os.path.abspath(args.images)]
+        completed = subprocess.run(command, capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+        if completed.returncode != 0:
+            print(f"{backend}: failed\n{completed.stderr.strip()[-2000:]}")
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    reference = next((r["top_labels"] for r in results if r["backend"] == "torch"), None)
+    print(f"{'backend':<8} {'load s':>7} {'peak MB':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{f'batch {args.batch_size} img/s':>15} {'top-1 agree':>12}")
+    for r in results:
+        agreement = "-"
+        if reference is not None:
+            agreement = f"{np.mean([r['top_labels'][name] == label for name, label in reference.items()]):.3f}"
+        print(f"{r['backend']:<8} {r['load_s']:>7.1f} {r['peak_mb']:>9.0f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['batch_images_s']:>15.1f} {agreement:>12}")
@@ -1,6 +1,16 @@
 from PIL import Image
 import io
 
-def load_image(uploaded_file):
+def load_image(uploaded_file, min_side=None):
+    """
+    Opens an image as RGB. With min_side, large images are downscaled so their shorter
+    side is min_side (JPEGs are decoded directly at a reduced scale).
+    """
     image = Image.open(uploaded_file)
-    return image.convert("RGB")
+    if min_side:
+        image.draft("RGB", (min_side, min_side))
+    image = image.convert("RGB")
+    if min_side and min(image.size) > min_side:
+        scale = min_side / min(image.size)
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BICUBIC)
+    return image
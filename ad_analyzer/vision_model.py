@@ -1,24 +1,247 @@
 from transformers import CLIPProcessor, CLIPModel
 from PIL import Image
+from collections import OrderedDict
+import os
+import json
+import hashlib
+import threading
+import numpy as np
 import torch
 
-processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-
-def describe_image(image: Image.Image):
-    prompts = [
-        "an image of a smiling person",
-        "an image with a lot of text",
-        "an image with vibrant colors",
-        "an image with product packaging",
-        "an emotional photo",
-        "a boring or empty image"
-    ]
-    
-    inputs = processor(text=prompts, images=image, return_tensors="pt", padding=True)
-    outputs = model(**inputs)
-    logits_per_image = outputs.logits_per_image
-    probs = logits_per_image.softmax(dim=1).detach().numpy()[0]
-
-    top_prompt = prompts[probs.argmax()]
-    return top_prompt, dict(zip(prompts, probs))
+MODEL_NAME = "openai/clip-vit-base-patch32"
+DEFAULT_PROMPTS = [
+    "an image of a smiling person",
+    "an image with a lot of text",
+    "an image with vibrant colors",
+    "an image with product packaging",
+    "an emotional photo",
+    "a boring or empty image"
+]
+PROMPTS_FILE = os.getenv("AD_ANALYZER_PROMPTS_FILE")  # One prompt per line; replaces DEFAULT_PROMPTS
+# "torch" (fp32, inference mode), "int8" (dynamically quantized Linear layers) or "onnx" (ONNX Runtime)
+BACKEND = os.getenv("AD_ANALYZER_CLIP_BACKEND", "torch")
+BACKENDS = ("torch", "int8", "onnx")
+ONNX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "clip_onnx")  # Exported on first use
+TOP_K = 6                  # Labels returned (and sent to the analyzer) per image
+IMAGE_CACHE_SIZE = 256     # Image embeddings kept, keyed by pixel content
+TEXT_BATCH_SIZE = 64
+
+def load_prompts(path=PROMPTS_FILE):
+    if not path:
+        return list(DEFAULT_PROMPTS)
+    with open(path, encoding="utf-8") as f:
+        prompts = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not prompts:
+        raise ValueError(f"The prompts file '{path}' (AD_ANALYZER_PROMPTS_FILE) has no prompts.")
+    return prompts
+
+def normalize(features):
+    return features / np.linalg.norm(features, axis=-1, keepdims=True)
+
+class TorchEncoder:
+    """CLIP towers in PyTorch, run under inference mode (no autograd bookkeeping)."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def image_features(self, pixel_values):
+        with torch.inference_mode():
+            return self.model.get_image_features(pixel_values=torch.from_numpy(pixel_values)).numpy()
+
+    def text_features(self, input_ids, attention_mask):
+        with torch.inference_mode():
+            return self.model.get_text_features(input_ids=torch.from_numpy(input_ids),
+                                                attention_mask=torch.from_numpy(attention_mask)).numpy()
+
+class _ImageTower(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model.get_image_features(pixel_values=pixel_values)
+
+class _TextTower(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+def export_onnx(onnx_dir=ONNX_DIR):
+    """Exports the image and text towers of MODEL_NAME to ONNX, with dynamic batch and sequence axes."""
+    model = CLIPModel.from_pretrained(MODEL_NAME).eval()
+    os.makedirs(onnx_dir, exist_ok=True)
+    size = model.config.vision_config.image_size
+    with torch.no_grad():
+        torch.onnx.export(_ImageTower(model), (torch.zeros(1, 3, size, size),),
+                          os.path.join(onnx_dir, "image.onnx"), opset_version=14,
+                          input_names=["pixel_values"], output_names=["image_embeds"],
+                          dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}})
+        dummy_ids = torch.ones(1, 8, dtype=torch.long)
+        torch.onnx.export(_TextTower(model), (dummy_ids, torch.ones_like(dummy_ids)),
+                          os.path.join(onnx_dir, "text.onnx"), opset_version=14,
+                          input_names=["input_ids", "attention_mask"], output_names=["text_embeds"],
+                          dynamic_axes={"input_ids": {0: "batch", 1: "sequence"},
+                                        "attention_mask": {0: "batch", 1: "sequence"},
+                                        "text_embeds": {0: "batch"}})
+    # Written last: its presence means the export finished.
+    with open(os.path.join(onnx_dir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({"model": MODEL_NAME, "logit_scale": model.logit_scale.exp().item()}, f)
+
+def load_onnx_config(onnx_dir):
+    try:
+        with open(os.path.join(onnx_dir, "config.json"), encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return config if config.get("model") == MODEL_NAME else None
+
+class OnnxEncoder:
+    """CLIP towers exported to ONNX and run with ONNX Runtime on the CPU."""
+
+    def __init__(self, onnx_dir=ONNX_DIR):
+        import onnxruntime as ort
+        config = load_onnx_config(onnx_dir)
+        if config is None:
+            print(f"Exporting {MODEL_NAME} to ONNX in {onnx_dir}...")
+            export_onnx(onnx_dir)
+            config = load_onnx_config(onnx_dir)
+        self.logit_scale = config["logit_scale"]
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.image_session = ort.InferenceSession(os.path.join(onnx_dir, "image.onnx"), options,
+                                                  providers=["CPUExecutionProvider"])
+        self.text_session = ort.InferenceSession(os.path.join(onnx_dir, "text.onnx"), options,
+                                                 providers=["CPUExecutionProvider"])
+
+    def image_features(self, pixel_values):
+        return self.image_session.run(None, {"pixel_values": pixel_values.astype(np.float32)})[0]
+
+    def text_features(self, input_ids, attention_mask):
+        return self.text_session.run(None, {"input_ids": input_ids.astype(np.int64),
+                                            "attention_mask": attention_mask.astype(np.int64)})[0]
+
+def load_encoder(backend):
+    """Returns the encoder of a backend and CLIP's logit scale."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown CLIP backend '{backend}'. Expected one of {BACKENDS}.")
+    if backend == "onnx":
+        encoder = OnnxEncoder()
+        return encoder, encoder.logit_scale
+    model = CLIPModel.from_pretrained(MODEL_NAME).eval()
+    logit_scale = model.logit_scale.exp().item()
+    if backend == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return TorchEncoder(model), logit_scale
+
+class ImageEmbeddingCache:
+    """LRU of image embeddings keyed by a hash of the decoded pixels."""
+
+    def __init__(self, max_entries=IMAGE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # Streamlit sessions run on separate threads
+
+    @staticmethod
+    def key(image: Image.Image):
+        digest = hashlib.sha256(f"{image.mode}{image.size}".encode("utf-8"))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return embedding
+
+    def put(self, key, embedding):
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class ClipModel:
+    """
+    CLIP zero-shot labeler on a selectable backend. Prompt embeddings are computed once
+    (see set_prompts), so each image costs one vision forward pass and a matrix product.
+    """
+
+    def __init__(self, backend=BACKEND, prompts=None, image_cache_size=IMAGE_CACHE_SIZE):
+        self.backend = backend
+        self.processor = CLIPProcessor.from_pretrained(MODEL_NAME)
+        self.encoder, self.logit_scale = load_encoder(backend)
+        self.image_cache = ImageEmbeddingCache(image_cache_size)
+        self.set_prompts(prompts or load_prompts())
+
+    def encode_prompts(self, prompts):
+        """L2-normalized text embeddings of the prompts, one row per prompt."""
+        rows = []
+        for i in range(0, len(prompts), TEXT_BATCH_SIZE):
+            inputs = self.processor(text=prompts[i:i + TEXT_BATCH_SIZE], return_tensors="np", padding=True)
+            rows.append(normalize(self.encoder.text_features(inputs["input_ids"], inputs["attention_mask"])))
+        return np.concatenate(rows)
+
+    def set_prompts(self, prompts):
+        """Replaces the labels images are scored against; their embeddings are computed once, here."""
+        prompts = list(prompts)
+        if not prompts:
+            raise ValueError("At least one prompt is needed to label images.")
+        self.prompt_set = (prompts, self.encode_prompts(prompts))  # Swapped together for concurrent readers
+
+    def embed_images(self, images):
+        """Embeddings of several images (rows), running the vision tower once on the uncached ones."""
+        keys = [self.image_cache.key(image) for image in images]
+        embeddings = [self.image_cache.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            inputs = self.processor(images=[images[i] for i in missing], return_tensors="np")
+            computed = normalize(self.encoder.image_features(inputs["pixel_values"]))
+            for i, embedding in zip(missing, computed):
+                self.image_cache.put(keys[i], embedding)
+                embeddings[i] = embedding
+        return np.stack(embeddings)
+
+    def describe_embedding(self, embedding, top_k=TOP_K):
+        """Scores an image embedding against every prompt: one matrix-vector product and a softmax."""
+        prompts, prompt_matrix = self.prompt_set
+        logits = self.logit_scale * (prompt_matrix @ embedding)
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        order = np.argsort(probs)[::-1][:top_k]
+        return prompts[order[0]], {prompts[i]: float(probs[i]) for i in order}
+
+    def describe_image(self, image: Image.Image, top_k=TOP_K):
+        return self.describe_embedding(self.embed_images([image])[0], top_k)
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """The process-wide ClipModel on BACKEND, loaded on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = ClipModel()
+    return _model
+
+def set_prompts(prompts):
+    get_model().set_prompts(prompts)
+
+def embed_images(images):
+    return get_model().embed_images(images)
+
+def describe_embedding(embedding, top_k=TOP_K):
+    return get_model().describe_embedding(embedding, top_k)
+
+def describe_image(image: Image.Image, top_k=TOP_K):
+    return get_model().describe_image(image, top_k)
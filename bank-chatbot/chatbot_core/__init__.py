@@ -0,0 +1,9 @@
+"""
+Shared core of the bank chatbot backends: retrieval over the employee manual,
+sessions, request logging, intent routing and the pluggable LLM providers.
+
+Each backend folder (backend-openai, backend-local-llm) is a thin entry point that
+picks its default providers and holds its data files (index cache, request log,
+sessions). Run the scripts from a backend folder with the parent on the path, e.g.:
+    PYTHONPATH=.. python -m chatbot_core.benchmark_index
+"""
@@ -0,0 +1,200 @@
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from .config import ANALYTICS_DB_FILE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY,
+    request_id TEXT,
+    timestamp TEXT NOT NULL,
+    sender_id TEXT,
+    employee_id TEXT,
+    question TEXT,
+    answer TEXT,
+    category TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_requests_request_id ON requests (request_id);
+CREATE INDEX IF NOT EXISTS idx_requests_sender ON requests (sender_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_requests_employee ON requests (employee_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_requests_timestamp ON requests (timestamp);
+CREATE INDEX IF NOT EXISTS idx_requests_category ON requests (category, timestamp);
+
+-- Counters maintained incrementally on insert
+CREATE TABLE IF NOT EXISTS category_counts (
+    category TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS category_hourly_counts (
+    hour TEXT NOT NULL,
+    category TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (hour, category)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+REFERRAL_PATTERN = "%Referral%"
+
+def legacy_request_id(entry):
+    """Deterministic id for entries logged before request ids were, so re-imports skip them too."""
+    return "legacy-" + hashlib.sha256(json.dumps(entry, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def to_hour(timestamp):
+    """Truncates an ISO timestamp (string or datetime) to its hour bucket."""
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    return timestamp[:13]
+
+class RequestAnalyticsStore:
+    """
+    SQLite (WAL) store of logged requests, indexed by sender, employee, timestamp
+    and category, with per-category and per-hour counters kept up to date on insert.
+    """
+
+    def __init__(self, path=ANALYTICS_DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(requests)")}
+            if columns and "request_id" not in columns:  # Stores created before request ids were logged
+                conn.execute("ALTER TABLE requests ADD COLUMN request_id TEXT")
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add_entries(self, entries):
+        """
+        Inserts a batch of log entries and updates the counters in one transaction.
+        Entries without a timestamp are skipped, and so are request ids already stored
+        (the backfill and the live sink can both see an entry logged around the cutoff).
+        Returns the number of inserted entries.
+        """
+        rows = [
+            (e.get("request_id"), e["timestamp"], e.get("sender_id"),
+             None if e.get("employee_id") is None else str(e.get("employee_id")),
+             e.get("question"), e.get("answer"), e.get("category", "Uncategorized"))
+            for e in entries if e.get("timestamp")
+        ]
+        totals = {}
+        hourly = {}
+        with self._connection() as conn:
+            for row in rows:
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO requests (request_id, timestamp, sender_id, employee_id, question, answer, category) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", row).rowcount
+                if inserted:
+                    totals[row[6]] = totals.get(row[6], 0) + 1
+                    hourly[(to_hour(row[1]), row[6])] = hourly.get((to_hour(row[1]), row[6]), 0) + 1
+            conn.executemany(
+                "INSERT INTO category_counts (category, count) VALUES (?, ?) "
+                "ON CONFLICT(category) DO UPDATE SET count = count + excluded.count",
+                totals.items())
+            conn.executemany(
+                "INSERT INTO category_hourly_counts (hour, category, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(hour, category) DO UPDATE SET count = count + excluded.count",
+                [(hour, category, count) for (hour, category), count in hourly.items()])
+        return sum(totals.values())
+
+    def backfill(self, entries_iter, batch_size=10000):
+        """
+        Imports existing log entries once, when the store is first created.
+        Only entries older than the moment the backfill starts are imported; newer
+        ones reach the store through add_entries(), which also drops any entry both
+        paths see. The cutoff is recorded first and 'backfilled' only once the last
+        batch is committed, so an interrupted import runs again (with the same cutoff)
+        on the next start; entries it already imported are skipped by request id.
+        Returns the number of imported entries (0 if the store was already backfilled).
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone():
+                conn.rollback()
+                return 0
+            row = conn.execute("SELECT value FROM meta WHERE key = 'backfill_cutoff'").fetchone()
+            if row is None:
+                cutoff = datetime.now().isoformat()
+                conn.execute("INSERT INTO meta (key, value) VALUES ('backfill_cutoff', ?)", (cutoff,))
+            else:
+                cutoff = row["value"]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        imported = 0
+        batch = []
+        for entry in entries_iter:
+            if entry.get("timestamp", "") >= cutoff:
+                continue
+            if not entry.get("request_id"):
+                entry = {**entry, "request_id": legacy_request_id(entry)}
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                imported += self.add_entries(batch)
+                batch = []
+        if batch:
+            imported += self.add_entries(batch)
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', ?)", (cutoff,))
+        return imported
+
+    def get_request_history(self, sender_id, limit=None, offset=0):
+        """Returns the requests of a sender, oldest first."""
+        rows = self._connection().execute(
+            "SELECT timestamp, sender_id, employee_id, question, answer, category FROM requests "
+            "WHERE sender_id = ? ORDER BY timestamp, id LIMIT ? OFFSET ?",
+            (sender_id, -1 if limit is None else limit, offset)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_employee_history(self, employee_id, page=1, page_size=50):
+        """Returns one page of an employee's requests, newest first."""
+        rows = self._connection().execute(
+            "SELECT timestamp, sender_id, employee_id, question, answer, category FROM requests "
+            "WHERE employee_id = ? ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            (str(employee_id), page_size, (page - 1) * page_size)).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_requests_by_category(self):
+        rows = self._connection().execute("SELECT category, count FROM category_counts").fetchall()
+        return {row["category"]: row["count"] for row in rows}
+
+    def count_requests_in_window(self, start, end=None):
+        """
+        Counts requests by category between start (inclusive) and end (exclusive).
+        Counts are aggregated per hour, so both bounds are truncated to the hour.
+        """
+        query = "SELECT category, SUM(count) AS count FROM category_hourly_counts WHERE hour >= ?"
+        params = [to_hour(start)]
+        if end is not None:
+            query += " AND hour < ?"
+            params.append(to_hour(end))
+        rows = self._connection().execute(query + " GROUP BY category", params).fetchall()
+        return {row["category"]: row["count"] for row in rows}
+
+    def top_unanswered_questions(self, n=10, since=None):
+        """Returns the n most frequent questions answered with a referral, most frequent first."""
+        # Resolving the referral categories first lets SQLite use the category index.
+        query = ("SELECT LOWER(TRIM(question)) AS question, COUNT(*) AS count, MAX(timestamp) AS last_asked "
+                 "FROM requests WHERE category IN (SELECT category FROM category_counts WHERE category LIKE ?)")
+        params = [REFERRAL_PATTERN]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since.isoformat() if isinstance(since, datetime) else since)
+        query += " GROUP BY LOWER(TRIM(question)) ORDER BY count DESC LIMIT ?"
+        params.append(n)
+        return [dict(row) for row in self._connection().execute(query, params).fetchall()]
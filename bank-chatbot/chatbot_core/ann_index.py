@@ -0,0 +1,143 @@
+import faiss
+import numpy as np
+from .config import (
+    INDEX_TYPE, IVF_NLIST, IVF_NPROBE, HNSW_M, HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH, PQ_M, PQ_NBITS, PQ_REFINE_K_FACTOR, ANN_TRAIN_SAMPLE_SIZE
+)
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+
+# FAISS warns when an IVF cell gets fewer training points than this.
+MIN_POINTS_PER_CELL = 39
+
+# IO_FLAG_MMAP alone still reads flat vectors into memory; IO_FLAG_MMAP_IFC (newer faiss)
+# maps them, so only the pages a search touches are loaded. IVF lists are mapped by IO_FLAG_MMAP.
+# The IVF-PQ precomputed table (nlist * PQ_M * 256 floats, ~200 MB at the defaults) is not
+# loaded; distance tables are computed per query instead, with the same results.
+STORE_READ_FLAGS = faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+SEARCH_READ_FLAGS = faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_SKIP_PRECOMPUTE_TABLE", 0)
+
+def get_index_params(index_type=INDEX_TYPE):
+    """Returns the build parameters that identify an index of the given type."""
+    if index_type == "ivf":
+        return {"nlist": IVF_NLIST}
+    if index_type == "hnsw":
+        return {"M": HNSW_M, "efConstruction": HNSW_EF_CONSTRUCTION}
+    if index_type == "ivfpq":
+        return {"nlist": IVF_NLIST, "pq_m": PQ_M, "pq_nbits": PQ_NBITS, "refine": "store"}
+    return {}
+
+def get_index_key(index_type=INDEX_TYPE):
+    """Returns a file-name friendly key for the index type and its build parameters."""
+    params = get_index_params(index_type)
+    return "-".join([index_type] + [f"{name}{value}" for name, value in sorted(params.items())])
+
+def get_store_vectors(store_index):
+    """Returns the vectors and ids held by an IndexIDMap-wrapped flat index."""
+    ids = faiss.vector_to_array(store_index.id_map).astype('int64')
+    vectors = store_index.index.reconstruct_n(0, store_index.ntotal)
+    return vectors, ids
+
+def sample_training_vectors(vectors, sample_size=ANN_TRAIN_SAMPLE_SIZE, seed=1234):
+    """Draws a random sample of the vectors to train IVF centroids and PQ codebooks."""
+    if len(vectors) <= sample_size:
+        return vectors
+    rng = np.random.default_rng(seed)
+    return vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+
+def build_ann_index(vectors, ids, index_type=INDEX_TYPE, params=None):
+    """
+    Builds an approximate nearest-neighbour index of the given type over the vectors.
+    Raises ValueError when the corpus is too small or the parameters do not fit it.
+    """
+    params = params or get_index_params(index_type)
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    n, dimension = vectors.shape
+
+    if index_type == "flat":
+        ann_index = faiss.IndexIDMap(faiss.IndexFlatL2(dimension))
+    elif index_type == "hnsw":
+        hnsw_index = faiss.IndexHNSWFlat(dimension, params["M"])
+        hnsw_index.hnsw.efConstruction = params["efConstruction"]
+        ann_index = faiss.IndexIDMap(hnsw_index)
+    elif index_type in ("ivf", "ivfpq"):
+        nlist = max(1, min(params["nlist"], n // MIN_POINTS_PER_CELL))
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == "ivf":
+            ann_index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        else:
+            if dimension % params["pq_m"] != 0:
+                raise ValueError(f"PQ_M={params['pq_m']} does not divide the embedding dimension {dimension}.")
+            if n < 2 ** params["pq_nbits"] * MIN_POINTS_PER_CELL:
+                raise ValueError(f"{n} vectors are too few to train a {params['pq_nbits']}-bit PQ codebook.")
+            ann_index = faiss.IndexIDMap(faiss.IndexIVFPQ(quantizer, dimension, nlist, params["pq_m"], params["pq_nbits"]))
+        # Every centroid needs MIN_POINTS_PER_CELL training points (nlist is capped so n has them).
+        ann_index.train(sample_training_vectors(vectors, max(ANN_TRAIN_SAMPLE_SIZE, nlist * MIN_POINTS_PER_CELL)))
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}.")
+
+    ann_index.add_with_ids(vectors, np.asarray(ids, dtype='int64'))
+    return ann_index
+
+def build_search_index(store_index, index_type=INDEX_TYPE, params=None):
+    """
+    Builds the index of the given type over the vectors of the store index. The ivfpq
+    index is addressed by position in the store rather than by chunk id (see RefinedIndex).
+    """
+    vectors, ids = get_store_vectors(store_index)
+    if index_type == "ivfpq":
+        ids = np.arange(len(ids), dtype='int64')
+    return build_ann_index(vectors, ids, index_type, params)
+
+def attach_store(search_index, store_index, index_type=INDEX_TYPE):
+    """Returns the index to query: ivfpq is wrapped to re-rank against the store index."""
+    if index_type == "ivfpq":
+        return RefinedIndex(search_index, store_index)
+    return search_index
+
+class RefinedIndex:
+    """
+    IVF-PQ search re-ranked by exact L2 distance. PQ distances alone cap recall@k near 0.6,
+    so the k * k_factor PQ candidates are re-scored against the flat store index the process
+    already holds, instead of keeping a second copy of the full vectors (as IndexRefineFlat
+    would). The PQ index holds store positions, which are mapped back to chunk ids.
+    """
+
+    def __init__(self, pq_index, store_index, k_factor=PQ_REFINE_K_FACTOR):
+        self.pq_index = pq_index
+        self.store_vectors = store_index.index
+        self.ids = faiss.vector_to_array(store_index.id_map).astype('int64')
+        self.k_factor = k_factor
+        self.ntotal = pq_index.ntotal
+
+    def search(self, queries, k):
+        queries = np.ascontiguousarray(queries, dtype='float32')
+        _, candidates = self.pq_index.search(queries, k * self.k_factor)
+        distances = np.full((len(queries), k), np.inf, dtype='float32')
+        labels = np.full((len(queries), k), -1, dtype='int64')
+        for row, (query, positions) in enumerate(zip(queries, candidates)):
+            positions = positions[positions >= 0]
+            if not len(positions):
+                continue
+            exact = ((self.store_vectors.reconstruct_batch(positions) - query) ** 2).sum(axis=1)
+            best = np.argsort(exact)[:k]
+            distances[row, :len(best)] = exact[best]
+            labels[row, :len(best)] = self.ids[positions[best]]
+        return distances, labels
+
+def set_search_params(search_index, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH, refine_k_factor=PQ_REFINE_K_FACTOR):
+    """Applies the query-time knobs (IVF nprobe, HNSW efSearch, refine k factor) to an index."""
+    if isinstance(search_index, RefinedIndex):
+        search_index.k_factor = refine_k_factor
+        set_search_params(search_index.pq_index, nprobe, ef_search)
+        return search_index
+    base_index = search_index
+    if isinstance(search_index, faiss.IndexIDMap):
+        base_index = faiss.downcast_index(search_index.index)
+    if isinstance(base_index, faiss.IndexHNSW):
+        base_index.hnsw.efSearch = ef_search
+    try:
+        faiss.extract_index_ivf(base_index).nprobe = nprobe
+    except RuntimeError:
+        pass  # Not an IVF index
+    return search_index
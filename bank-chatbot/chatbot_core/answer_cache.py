@@ -0,0 +1,93 @@
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from .config import ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS
+
+class SemanticAnswerCache:
+    """
+    LRU + TTL cache of LLM answers keyed on the query embedding.
+
+    A question hits the cache when it retrieved the same context chunks as a cached
+    question and their embeddings have a cosine similarity of at least `similarity`.
+    """
+
+    def __init__(self, similarity=ANSWER_CACHE_SIMILARITY, max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                 ttl_seconds=ANSWER_CACHE_TTL_SECONDS):
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # entry key -> (context key, unit embedding, answer, expires_at)
+        self._by_context = {}          # context key -> set of entry keys
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _context_key(chunk_ids):
+        return tuple(sorted(chunk_ids))
+
+    @staticmethod
+    def _normalize(embedding):
+        embedding = np.asarray(embedding, dtype='float32').ravel()
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def get(self, embedding, chunk_ids):
+        """Returns the cached answer for a similar question with the same context, or None."""
+        context_key = self._context_key(chunk_ids)
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_score = None, self.similarity
+            for entry_key in list(self._by_context.get(context_key, ())):
+                _, cached_embedding, _, expires_at = self._entries[entry_key]
+                if expires_at <= now:
+                    self._remove(entry_key)
+                    continue
+                score = float(np.dot(query, cached_embedding))
+                if score >= best_score:
+                    best_key, best_score = entry_key, score
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][2]
+
+    def put(self, embedding, chunk_ids, answer):
+        """Caches an answer, evicting the least recently used entries beyond max_entries."""
+        context_key = self._context_key(chunk_ids)
+        with self._lock:
+            entry_key = self._next_key
+            self._next_key += 1
+            self._entries[entry_key] = (context_key, self._normalize(embedding), answer,
+                                        time.monotonic() + self.ttl_seconds)
+            self._by_context.setdefault(context_key, set()).add(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        """Drops every cached answer (e.g. after the manual index is rebuilt)."""
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+    def _remove(self, entry_key):
+        context_key = self._entries.pop(entry_key)[0]
+        keys = self._by_context.get(context_key)
+        if keys is not None:
+            keys.discard(entry_key)
+            if not keys:
+                del self._by_context[context_key]
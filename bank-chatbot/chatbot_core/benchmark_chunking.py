@@ -0,0 +1,97 @@
+"""
+Retrieval quality and index size of the "line" and "sentence" chunking strategies.
+
+For every strategy the manual is chunked, embedded and indexed (exact flat index), then:
+  - coverage@k: sentences sampled from the manual are used as queries, and coverage is the
+    fraction of each sentence's words found in the k retrieved chunks (1.0 = the whole
+    source passage came back)
+  - distinct@k: distinct chunk texts among the k results (duplicates waste retrieval slots)
+  - hit@k: with --queries, the fraction of labeled questions whose expected answer text
+    appears in one of the k retrieved chunks. The file is JSON Lines:
+    {"question": "...", "answer": "..."}
+
+Usage:
+    python -m chatbot_core.benchmark_chunking
+    python -m chatbot_core.benchmark_chunking --queries manual_questions.jsonl -k 4
+"""
+import json
+import time
+import random
+import argparse
+import faiss
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from .config import PDF_PATH, EMBEDDING_MODEL_NAME
+from .chunker import Chunker, CHUNK_STRATEGIES, normalize_line, split_sentences
+from .data_processor import read_pdf_paragraphs
+
+def sample_sentences(pages, n, min_words=8, seed=1234):
+    """Samples sentences of at least min_words words from the manual to use as queries."""
+    sentences = [s for page in pages for paragraph in page
+                 for s in split_sentences([line.strip() for line in paragraph if line.strip()])
+                 if len(s.split()) >= min_words]
+    random.Random(seed).shuffle(sentences)
+    return sentences[:n]
+
+def coverage(sentence, retrieved):
+    words = set(normalize_line(sentence).split())
+    found = set(normalize_line(" ".join(retrieved)).split())
+    return len(words & found) / len(words)
+
+def evaluate(strategy, pages, model, sentences, labeled, k):
+    chunker = Chunker(strategy=strategy, count_tokens=lambda text: len(model.tokenizer.tokenize(text)))
+    chunks = [chunk for page_chunks in chunker.chunk_pages(pages) for chunk in page_chunks]
+
+    start = time.perf_counter()
+    embeddings = np.asarray(model.encode(chunks, batch_size=64), dtype='float32')
+    embed_seconds = time.perf_counter() - start
+    search_index = faiss.IndexFlatL2(embeddings.shape[1])
+    search_index.add(embeddings)
+
+    def search(questions):
+        _, ids = search_index.search(np.asarray(model.encode(questions), dtype='float32'), k)
+        return [[chunks[i] for i in row if i >= 0] for row in ids]
+
+    sentence_results = search(sentences)
+    result = {
+        "strategy": strategy,
+        "chunks": len(chunks),
+        "avg_tokens": np.mean([chunker.count_tokens(c) for c in chunks]),
+        "index_mb": faiss.serialize_index(search_index).nbytes / (1024 * 1024),
+        "embed_s": embed_seconds,
+        "coverage": np.mean([coverage(s, r) for s, r in zip(sentences, sentence_results)]),
+        "distinct": np.mean([len({normalize_line(c) for c in r}) / k for r in sentence_results]),
+        "hit": None,
+        "dropped": chunker.last_stats
+    }
+    if labeled:
+        labeled_results = search([item["question"] for item in labeled])
+        result["hit"] = np.mean([
+            any(normalize_line(item["answer"]) in normalize_line(chunk) for chunk in retrieved)
+            for item, retrieved in zip(labeled, labeled_results)
+        ])
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the retrieval quality and index size of the chunking strategies.")
+    parser.add_argument("--pdf", default=PDF_PATH)
+    parser.add_argument("--queries", help="JSON Lines file of {\"question\", \"answer\"} pairs.")
+    parser.add_argument("--sentences", type=int, default=300, help="Sentences sampled as queries for coverage@k.")
+    parser.add_argument("-k", type=int, default=4)
+    args = parser.parse_args()
+
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    pages = read_pdf_paragraphs(args.pdf)
+    sentences = sample_sentences(pages, args.sentences)
+    labeled = []
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            labeled = [json.loads(line) for line in f if line.strip()]
+
+    print(f"{'strategy':<9} {'chunks':>7} {'avg tok':>8} {'index MB':>9} {'embed s':>8} "
+          f"{f'coverage@{args.k}':>11} {f'distinct@{args.k}':>11} {f'hit@{args.k}':>7}  dropped")
+    for strategy in CHUNK_STRATEGIES:
+        r = evaluate(strategy, pages, model, sentences, labeled, args.k)
+        hit = f"{r['hit']:.3f}" if r["hit"] is not None else "-"
+        print(f"{r['strategy']:<9} {r['chunks']:>7} {r['avg_tokens']:>8.1f} {r['index_mb']:>9.2f} {r['embed_s']:>8.2f} "
+              f"{r['coverage']:>11.3f} {r['distinct']:>11.3f} {hit:>7}  {r['dropped']}")
@@ -0,0 +1,185 @@
+"""
+Recall@k vs latency report for the search index types.
+
+Compares every approximate index type (and a sweep of its query-time knob)
+against the exact flat baseline, reporting recall@k, single-query latency,
+batched throughput, build time, index size and resident memory. For ivfpq,
+k_factor=1 is the recall of the PQ codes alone (no candidates beyond k to re-rank).
+
+Resident memory is measured in a subprocess per index type that loads the indexes the
+way a worker does and runs the queries: "heap MB" is private memory, "mapped MB" the
+pages of memory-mapped index files it touched (shared between workers, reclaimable).
+
+Usage:
+    python -m chatbot_core.benchmark_index                      # Benchmark on the manual's chunk embeddings
+    python -m chatbot_core.benchmark_index --synthetic 1000000  # Benchmark on N synthetic embeddings
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import faiss
+import numpy as np
+from .ann_index import (
+    INDEX_TYPES, STORE_READ_FLAGS, SEARCH_READ_FLAGS, build_ann_index, build_search_index,
+    attach_store, set_search_params, get_store_vectors
+)
+
+NPROBE_SWEEP = (1, 4, 16, 64)
+EF_SEARCH_SWEEP = (16, 32, 64, 128)
+REFINE_K_FACTOR_SWEEP = (1, 4, 16)
+
+def make_synthetic_vectors(n, dimension=384, n_clusters=1000, seed=1234):
+    """Generates clustered, L2-normalized vectors that mimic sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dimension)).astype('float32')
+    vectors = np.empty((n, dimension), dtype='float32')
+    for start in range(0, n, 100000):
+        end = min(start + 100000, n)
+        assignments = rng.integers(0, n_clusters, end - start)
+        vectors[start:end] = centers[assignments] + 0.5 * rng.standard_normal((end - start, dimension)).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def make_queries(vectors, n_queries, seed=4321):
+    """Builds queries by perturbing random corpus vectors."""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(0, len(vectors), n_queries)].copy()
+    queries += 0.05 * rng.standard_normal(queries.shape).astype('float32')
+    faiss.normalize_L2(queries)
+    return queries
+
+def recall_at_k(found, expected):
+    """Fraction of the exact top-k neighbours found by the approximate search."""
+    hits = sum(len(set(f) & set(e)) for f, e in zip(found, expected))
+    return hits / expected.size
+
+def measure(search_index, queries, k):
+    """Returns the ids found, p50/p99 single-query latency (ms) and batched queries/s."""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search_index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    _, found = search_index.search(queries, k)
+    batch_qps = len(queries) / (time.perf_counter() - start)
+    return found, np.percentile(latencies, 50), np.percentile(latencies, 99), batch_qps
+
+def index_size_mb(search_index):
+    return faiss.serialize_index(search_index).nbytes / (1024 * 1024)
+
+def resident_mb():
+    """Resident private (RssAnon) and file-backed (RssFile) MB of this process. Linux only."""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0]) / 1024
+    return fields["RssAnon"], fields["RssFile"]
+
+def resident_worker(directory, index_type, k):
+    """Loads store.faiss (and <index_type>.faiss) like a worker, runs the queries and returns the MB they added."""
+    queries = np.load(os.path.join(directory, "queries.npy"))
+    heap_before, mapped_before = resident_mb()
+    store_index = faiss.read_index(os.path.join(directory, "store.faiss"), STORE_READ_FLAGS)
+    search_index = store_index
+    if index_type != "flat":
+        search_index = faiss.read_index(os.path.join(directory, f"{index_type}.faiss"), SEARCH_READ_FLAGS)
+    search_index = set_search_params(attach_store(search_index, store_index, index_type))
+    for start in range(0, len(queries), 100):
+        search_index.search(queries[start:start + 100], k)
+    heap_after, mapped_after = resident_mb()
+    return {"heap_mb": heap_after - heap_before, "mapped_mb": mapped_after - mapped_before}
+
+def measure_resident(directory, index_type, k):
+    """Runs resident_worker in a fresh process. Returns (heap MB, mapped MB), NaN when it failed."""
+    completed = subprocess.run(
+        [sys.executable, "-m", __spec__.name, "--resident-worker", directory, "--index-type", index_type, "-k", str(k)],
+        capture_output=True, text=True
+    )
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        error = (completed.stderr.strip().splitlines() or ["unknown error"])[-1]
+        print(f"{index_type:<8} resident memory not measured: {error}")
+        return float("nan"), float("nan")
+    result = json.loads(lines[-1])
+    return result["heap_mb"], result["mapped_mb"]
+
+def run_benchmark(vectors, ids, n_queries=1000, k=4):
+    """Prints one report row per index type and query-time setting."""
+    queries = make_queries(vectors, n_queries)
+    print(f"Corpus: {len(vectors)} vectors of dimension {vectors.shape[1]}, {n_queries} queries, k={k}")
+    print(f"{'index':<8} {'setting':<14} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'batch q/s':>10} "
+          f"{'build s':>8} {'size MB':>9} {'heap MB':>9} {'mapped MB':>10}")
+
+    start = time.perf_counter()
+    store_index = build_ann_index(vectors, ids, "flat")
+    store_seconds = time.perf_counter() - start
+    expected = None
+    with tempfile.TemporaryDirectory() as directory:
+        faiss.write_index(store_index, os.path.join(directory, "store.faiss"))
+        np.save(os.path.join(directory, "queries.npy"), queries)
+
+        for index_type in INDEX_TYPES:
+            start = time.perf_counter()
+            try:
+                built_index = store_index if index_type == "flat" else build_search_index(store_index, index_type)
+            except ValueError as e:
+                print(f"{index_type:<8} skipped: {e}")
+                continue
+            build_seconds = store_seconds if index_type == "flat" else time.perf_counter() - start
+            size_mb = index_size_mb(built_index)
+            search_index = built_index
+            if index_type != "flat":
+                path = os.path.join(directory, f"{index_type}.faiss")
+                faiss.write_index(built_index, path)
+                search_index = attach_store(faiss.read_index(path, SEARCH_READ_FLAGS), store_index, index_type)
+            heap_mb, mapped_mb = measure_resident(directory, index_type, k)
+
+            if index_type == "hnsw":
+                settings = [("efSearch", value, {"ef_search": value}) for value in EF_SEARCH_SWEEP]
+            elif index_type == "ivf":
+                settings = [("nprobe", value, {"nprobe": value}) for value in NPROBE_SWEEP]
+            elif index_type == "ivfpq":
+                settings = [("nprobe", value, {"nprobe": value}) for value in NPROBE_SWEEP]
+                settings += [("k_factor", value, {"refine_k_factor": value}) for value in REFINE_K_FACTOR_SWEEP]
+            else:
+                settings = [("exact", "", {})]
+
+            for name, value, params in settings:
+                set_search_params(search_index, **params)
+                found, p50, p99, batch_qps = measure(search_index, queries, k)
+                if expected is None:
+                    expected = found
+                print(f"{index_type:<8} {f'{name}={value}' if value else name:<14} {recall_at_k(found, expected):>9.3f} "
+                      f"{p50:>8.3f} {p99:>8.3f} {batch_qps:>10.0f} {build_seconds:>8.1f} {size_mb:>9.1f} "
+                      f"{heap_mb:>9.1f} {mapped_mb:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k vs latency report for the search index types.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Number of synthetic vectors (default: use the manual).")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--resident-worker", help=argparse.SUPPRESS)  # Internal: measure one index type's memory
+    parser.add_argument("--index-type", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.resident_worker:
+        print(json.dumps(resident_worker(args.resident_worker, args.index_type, args.k)))
+        sys.exit(0)
+
+    if args.synthetic:
+        corpus = make_synthetic_vectors(args.synthetic)
+        corpus_ids = np.arange(len(corpus), dtype='int64')
+    else:
+        from . import data_processor
+        data_processor.initialize_data()  # Builds or refreshes the on-disk store
+        store_dir = data_processor.get_store_dir()
+        generation_dir, _, _ = data_processor.load_store(store_dir)
+        corpus, corpus_ids = get_store_vectors(data_processor.read_store_index(generation_dir))
+    run_benchmark(corpus, corpus_ids, n_queries=args.queries, k=args.k)
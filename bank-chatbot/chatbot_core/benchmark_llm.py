@@ -0,0 +1,80 @@
+"""
+Memory, load time and tokens/s of the local LLM for each precision mode.
+
+Every mode runs in its own subprocess so peak memory is measured in isolation. "model MB" is
+the size of the loaded weights and buffers (the GGUF file for gguf); "peak RSS MB" also
+counts everything the load needed along the way.
+
+Usage:
+    python -m chatbot_core.benchmark_llm --modes fp32 bf16 int8 gguf
+    python -m chatbot_core.benchmark_llm --model sshleifer/tiny-gpt2 --modes fp32 int8
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+from .config import LLM_MODEL_NAME, LLM_GGUF_PATH
+
+PROMPT = "¿Cuántos días de vacaciones tengo después de cinco años en el banco?"
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_mode(model_name, precision, gguf_path, max_new_tokens, runs):
+    """Loads the model in one precision and measures it. Returns a result dict."""
+    from .llm_loader import load_local_llm, model_bytes
+
+    start = time.perf_counter()
+    _, generator = load_local_llm(model_name, precision, gguf_path)
+    load_seconds = time.perf_counter() - start
+    weights = os.path.getsize(gguf_path) if precision == "gguf" else model_bytes(generator.model)
+
+    generator.generate(PROMPT, max_new_tokens=8)  # Warm-up
+    tokens_before = generator.generated_tokens
+    start = time.perf_counter()
+    for _ in range(runs):
+        generator.generate(PROMPT, max_new_tokens=max_new_tokens)
+    elapsed = time.perf_counter() - start
+    tokens = generator.generated_tokens - tokens_before
+
+    return {
+        "mode": precision,
+        "load_s": round(load_seconds, 2),
+        "model_mb": round(weights / (1024 * 1024), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "tokens_per_s": round(tokens / elapsed, 2) if elapsed else 0.0
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory, load time and tokens/s per LLM precision mode.")
+    parser.add_argument("--model", default=LLM_MODEL_NAME)
+    parser.add_argument("--gguf-path", default=LLM_GGUF_PATH)
+    parser.add_argument("--modes", nargs="+", default=["fp32", "bf16", "int8", "gguf"])
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--single", help=argparse.SUPPRESS)  # Internal: measure one mode in this process
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_mode(args.model, args.single, args.gguf_path, args.max_new_tokens, args.runs)))
+        sys.exit(0)
+
+    print(f"{'mode':<6} {'load s':>8} {'model MB':>10} {'peak RSS MB':>12} {'tokens/s':>9}")
+    for mode in args.modes:
+        completed = subprocess.run(
+            [sys.executable, "-m", __spec__.name, "--single", mode, "--model", args.model, "--gguf-path", args.gguf_path,
+             "--max-new-tokens", str(args.max_new_tokens), "--runs", str(args.runs)],
+            capture_output=True, text=True
+        )
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not lines:
+            error = (completed.stderr.strip().splitlines() or ["unknown error"])[-1]
+            print(f"{mode:<6} failed: {error}")
+            continue
+        result = json.loads(lines[-1])
+        print(f"{result['mode']:<6} {result['load_s']:>8} {result['model_mb']:>10} "
+              f"{result['peak_rss_mb']:>12} {result['tokens_per_s']:>9}")
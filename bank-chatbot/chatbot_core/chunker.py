@@ -0,0 +1,184 @@
+import re
+import random
+import hashlib
+from collections import Counter
+import numpy as np
+from .config import (
+    CHUNK_STRATEGY, CHUNK_TARGET_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_MIN_CHARS,
+    CHUNK_BOILERPLATE_PAGE_FRACTION, CHUNK_DEDUP_SIMILARITY
+)
+
+CHUNK_STRATEGIES = ("sentence", "line")
+
+# A line starting with a bullet or a list number starts a new sentence even without a period.
+LIST_ITEM = re.compile(r"^(?:[•▪●◦\-\*]|\d{1,2}[.)])\s+")
+SENTENCE_END = re.compile(r"(?<=[.!?…:;])\s+")
+
+def normalize_line(line):
+    """Lowercases, masks digits and collapses spaces, so "Página 3 de 40" and "Página 4 de 40" compare equal."""
+    return " ".join(re.sub(r"\d+", "#", line.lower()).split())
+
+def count_words(text):
+    return len(text.split())
+
+def split_sentences(paragraph_lines):
+    """Joins the wrapped lines of a paragraph and splits it into sentences and list items."""
+    units = []
+    for line in paragraph_lines:
+        if not units or LIST_ITEM.match(line):
+            units.append(line)
+        elif units[-1].endswith("-") and line[:1].islower():
+            units[-1] = units[-1][:-1] + line  # Word hyphenated across lines
+        else:
+            units[-1] += " " + line
+    return [sentence for unit in units for sentence in SENTENCE_END.split(unit) if sentence]
+
+class MinHashDeduplicator:
+    """
+    Near-duplicate detection with MinHash signatures over word shingles, bucketed with
+    LSH bands so each new text is only compared with likely matches.
+    """
+
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, similarity=CHUNK_DEDUP_SIMILARITY, num_perm=64, bands=16, shingle_size=3, seed=42):
+        rng = random.Random(seed)
+        self.similarity = similarity
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self._a = np.array([rng.randrange(1, self.PRIME) for _ in range(num_perm)], dtype='uint64')
+        self._b = np.array([rng.randrange(0, self.PRIME) for _ in range(num_perm)], dtype='uint64')
+        self._buckets = {}     # (band, band signature) -> signature indexes
+        self._signatures = []
+
+    def signature(self, text):
+        words = normalize_line(text).split()
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        hashes = np.array([int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") % self.PRIME
+                           for s in shingles], dtype='uint64')
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % self.PRIME).min(axis=1)
+
+    def is_duplicate(self, text):
+        """True if the text is a near-duplicate of a text seen before; otherwise remembers it."""
+        signature = self.signature(text)
+        keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+        candidates = {i for key in keys for i in self._buckets.get(key, ())}
+        for i in candidates:
+            if np.mean(self._signatures[i] == signature) >= self.similarity:
+                return True
+        self._signatures.append(signature)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(len(self._signatures) - 1)
+        return False
+
+class Chunker:
+    """
+    Splits the pages of a document into chunks for embedding.
+
+    "sentence": drops lines repeated on many pages (headers, footers) and near-duplicate
+    paragraphs, packs the sentences of each page's paragraphs into chunks of about
+    `target_tokens` with `overlap_tokens` of trailing context, and drops near-duplicate chunks.
+    "line": every line longer than `min_chars` is a chunk (the original behaviour).
+
+    `count_tokens` measures a text in tokens; word counts are used by default.
+    """
+
+    MIN_DEDUP_WORDS = 8
+
+    def __init__(self, strategy=CHUNK_STRATEGY, target_tokens=CHUNK_TARGET_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                 min_chars=CHUNK_MIN_CHARS, boilerplate_page_fraction=CHUNK_BOILERPLATE_PAGE_FRACTION,
+                 dedup_similarity=CHUNK_DEDUP_SIMILARITY, count_tokens=count_words):
+        if strategy not in CHUNK_STRATEGIES:
+            raise ValueError(f"Unknown chunk strategy '{strategy}'. Expected one of {CHUNK_STRATEGIES}.")
+        self.strategy = strategy
+        self.target_tokens = target_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_chars = min_chars
+        self.boilerplate_page_fraction = boilerplate_page_fraction
+        self.dedup_similarity = dedup_similarity
+        self.count_tokens = count_tokens
+        self.last_stats = {}
+
+    def chunk_pages(self, pages):
+        """
+        `pages` holds, for every page, its paragraphs as lists of lines.
+        Returns the chunk texts of every page, in page order.
+        """
+        if self.strategy == "line":
+            return [[line.strip() for paragraph in page for line in paragraph if len(line.strip()) > self.min_chars]
+                    for page in pages]
+
+        boilerplate = self._find_boilerplate(pages)
+        paragraph_deduplicator = MinHashDeduplicator(self.dedup_similarity)
+        chunk_deduplicator = MinHashDeduplicator(self.dedup_similarity)
+        stats = {"boilerplate_lines": 0, "duplicate_paragraphs": 0, "duplicate_chunks": 0}
+        chunked = []
+        for page in pages:
+            paragraphs = []
+            for paragraph in page:
+                lines = [line.strip() for line in paragraph if line.strip()]
+                kept = [line for line in lines if normalize_line(line) not in boilerplate]
+                stats["boilerplate_lines"] += len(lines) - len(kept)
+                # Short paragraphs (headings, labels) may legitimately repeat.
+                text = " ".join(kept)
+                if len(text.split()) >= self.MIN_DEDUP_WORDS and paragraph_deduplicator.is_duplicate(text):
+                    stats["duplicate_paragraphs"] += 1
+                    continue
+                if kept:
+                    paragraphs.append(kept)
+            page_chunks = []
+            for chunk in self._pack(paragraphs):
+                if len(chunk) <= self.min_chars:
+                    continue
+                if chunk_deduplicator.is_duplicate(chunk):
+                    stats["duplicate_chunks"] += 1
+                    continue
+                page_chunks.append(chunk)
+            chunked.append(page_chunks)
+        self.last_stats = stats
+        return chunked
+
+    def _find_boilerplate(self, pages):
+        """Normalized lines that appear on at least boilerplate_page_fraction of the pages (and 3 pages)."""
+        page_counts = Counter()
+        for page in pages:
+            page_counts.update({normalize_line(line) for paragraph in page for line in paragraph if line.strip()})
+        min_pages = max(3, self.boilerplate_page_fraction * len(pages))
+        return {line for line, count in page_counts.items() if count >= min_pages}
+
+    def _pack(self, paragraphs):
+        """Yields chunks of whole sentences up to target_tokens, each starting with overlap_tokens of the previous one."""
+        window = []  # (sentence, tokens)
+        window_tokens = 0
+        fresh = 0    # Sentences in the window not emitted yet
+        for paragraph in paragraphs:
+            for sentence in split_sentences(paragraph):
+                for piece in self._split_long(sentence):
+                    tokens = self.count_tokens(piece)
+                    if fresh and window_tokens + tokens > self.target_tokens:
+                        yield " ".join(s for s, _ in window)
+                        # Keep the trailing sentences that fit in the overlap as context for the next chunk.
+                        kept, kept_tokens = [], 0
+                        for s, t in reversed(window):
+                            if kept_tokens + t > self.overlap_tokens or kept_tokens + t + tokens > self.target_tokens:
+                                break
+                            kept.insert(0, (s, t))
+                            kept_tokens += t
+                        window, window_tokens, fresh = kept, kept_tokens, 0
+                    window.append((piece, tokens))
+                    window_tokens += tokens
+                    fresh += 1
+        if fresh:
+            yield " ".join(s for s, _ in window)
+
+    def _split_long(self, sentence):
+        """Splits a sentence longer than target_tokens into overlapping word windows."""
+        if self.count_tokens(sentence) <= self.target_tokens:
+            return [sentence]
+        words = sentence.split()
+        # Scale the word window by the sentence's tokens per word.
+        words_per_window = max(1, int(len(words) * self.target_tokens / self.count_tokens(sentence)))
+        step = max(1, words_per_window - int(words_per_window * self.overlap_tokens / self.target_tokens))
+        return [" ".join(words[i:i + words_per_window]) for i in range(0, max(1, len(words) - words_per_window + step), step)]
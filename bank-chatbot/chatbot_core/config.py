@@ -0,0 +1,141 @@
+import os
+
+# Fictitious company name
+COMPANY_NAME = "Aetheria Bank"
+BOT_NAME = "Asistente Virtual de Aetheria Bank"
+
+# OpenAI API Key (using environment variable)
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "YOUR_OPENAI_API_KEY_HERE")
+
+PDF_PATH = "docs/manual_empleados_aetheria.pdf"
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Chunking of the manual: "sentence" (sentence-aware windows over each page's paragraphs,
+# without repeated headers/footers or near-duplicate chunks) or "line" (every PDF line
+# longer than CHUNK_MIN_CHARS characters is a chunk)
+CHUNK_STRATEGY = "sentence"
+CHUNK_TARGET_TOKENS = 128                # Embedding model tokens per chunk
+CHUNK_OVERLAP_TOKENS = 32                # Tokens of the previous chunk repeated at the start of the next
+CHUNK_MIN_CHARS = 20
+CHUNK_BOILERPLATE_PAGE_FRACTION = 0.3    # Lines repeated on this fraction of the pages are dropped
+CHUNK_DEDUP_SIMILARITY = 0.85            # MinHash similarity above which a chunk is a near-duplicate
+
+# On-disk cache for chunks, embeddings and the FAISS index.
+# Bump INDEX_CACHE_VERSION whenever the chunking logic changes.
+INDEX_CACHE_DIR = "index_cache"
+INDEX_CACHE_VERSION = 1
+# Superseded generations are deleted only once they are neither among the newest
+# INDEX_KEEP_GENERATIONS nor younger than INDEX_GENERATION_GRACE_SECONDS, so workers
+# still opening one never lose its files.
+INDEX_KEEP_GENERATIONS = 3
+INDEX_GENERATION_GRACE_SECONDS = 600
+# Every worker checks CURRENT this often and loads a generation published by another worker
+# (e.g. through /admin/reindex).
+INDEX_REFRESH_SECONDS = 5
+
+# Search index type: "flat" (exact), "ivf", "hnsw" or "ivfpq" (IVF with product quantization,
+# re-ranked exactly)
+INDEX_TYPE = "flat"
+IVF_NLIST = 4096         # Number of IVF cells (capped by the corpus size)
+IVF_NPROBE = 16          # Cells visited per query
+HNSW_M = 32              # Neighbours per HNSW node
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+PQ_M = 48                # PQ sub-quantizers (must divide the embedding dimension)
+PQ_NBITS = 8
+# ivfpq re-ranks k * PQ_REFINE_K_FACTOR PQ candidates by exact distance against the store index
+# (no extra copy of the vectors). PQ distances alone cap recall@k near 0.6; 16 brings it to ~0.99.
+PQ_REFINE_K_FACTOR = 16
+ANN_TRAIN_SAMPLE_SIZE = 100000  # Embeddings sampled to train IVF/PQ (at least 39 per IVF cell)
+
+# Retrieval: "vector" (FAISS only) or "hybrid" (FAISS + BM25 keyword search, fused by reciprocal rank)
+RETRIEVAL_MODE = "hybrid"
+RETRIEVAL_CANDIDATES = 20    # Candidates taken from each retriever before fusion/reranking
+RRF_K = 60                   # Reciprocal-rank fusion constant
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Optional cross-encoder reranking of the fused candidates, e.g.
+# "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1" (multilingual); None disables it
+RERANKER_MODEL_NAME = None
+RERANKER_CACHE_MAX_ENTRIES = 50000  # Cached (question, chunk) scores
+
+# Micro-batching of concurrent query embeddings/searches
+QUERY_BATCH_MAX_SIZE = 32
+QUERY_BATCH_MAX_WAIT_MS = 5
+
+# Semantic cache of LLM answers
+ANSWER_CACHE_SIMILARITY = 0.92   # Minimum cosine similarity between questions
+ANSWER_CACHE_MAX_ENTRIES = 1024
+ANSWER_CACHE_TTL_SECONDS = 3600
+
+# Request log: append-only JSON Lines, rotated by size and age
+LOG_FILE = "request_log.jsonl"
+LEGACY_LOG_FILE = "request_log.json"  # JSON array format, migrated on startup
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_ROTATE_INTERVAL_SECONDS = 24 * 60 * 60
+LOG_BACKUP_COUNT = 30
+LOG_FLUSH_INTERVAL_SECONDS = 1.0
+ANALYTICS_DB_FILE = "request_analytics.db"  # Indexed SQLite copy of the log for queries
+
+# User sessions: "memory" (per process) or "sqlite" (shared by every worker process)
+SESSION_STORE = "memory"
+SESSION_TTL_SECONDS = 8 * 60 * 60
+SESSION_MAX_ENTRIES = 100000
+SESSION_DB_FILE = "sessions.db"
+
+# Intent routing: keyword matching, plus an optional embedding classifier over intent exemplars
+INTENT_EMBEDDING_CLASSIFIER = False
+INTENT_EMBEDDING_THRESHOLD = 0.75  # Minimum cosine similarity to the closest exemplar
+
+PORT = 5000
+
+# SQL Server Database Configuration
+DB_CONFIG = {
+    'driver': '{ODBC Driver 17 for SQL Server}',
+    'server': 'aetheria-db-server',  # Fictitious server name
+    'database': 'Aetheria_Employee_DB',  # Fictitious database name
+    'uid': 'ChatBotUser',              # Fictitious user
+    'pwd': 'FictionalPassword123'      # Fictitious password
+}
+
+# Local LLM model and precision:
+#   "auto" (fp16 on GPU, fp32 on CPU), "fp16" (GPU), "fp32", "bf16", "int8" (dynamic quantization on CPU)
+#   or "gguf" (quantized GGUF file run by llama.cpp, requires llama-cpp-python)
+LLM_MODEL_NAME = "mistralai/Mistral-7B-Instruct-v0.2"
+LLM_PRECISION = "auto"
+LLM_GGUF_PATH = "models/mistral-7b-instruct-v0.2.Q4_K_M.gguf"
+LLM_GGUF_THREADS = os.cpu_count()
+LLM_GGUF_CONTEXT_SIZE = 4096
+
+# Local LLM generation (continuous-batching generation server)
+LLM_MAX_NEW_TOKENS = 250
+LLM_TEMPERATURE = 0.7
+LLM_TOP_K = 50
+LLM_TOP_P = 0.95
+LLM_MAX_BATCH_SIZE = 8             # Sequences decoded together
+LLM_KV_CACHE_TOKEN_BUDGET = 16384  # Prompt + new tokens reserved across the running batch
+
+# LLM providers, tried in order for every request: "local", "openai" or "stub" (deterministic, for tests).
+# The next provider answers when one is still loading, overloaded, times out or fails,
+# e.g. "local,openai" sheds load from the local model to the OpenAI API.
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "local").split(",")
+LLM_LOCAL_TIMEOUT_SECONDS = 60
+LLM_LOCAL_MAX_QUEUE = 16           # Local requests waiting or running before it counts as overloaded
+
+# OpenAI (or any OpenAI-compatible server) client
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_MODEL_NAME = "gpt-3.5-turbo"
+OPENAI_TIMEOUT_SECONDS = 30            # Deadline of one call, retries included
+OPENAI_MAX_RETRIES = 3                 # Retries on 429, 5xx and connection errors
+OPENAI_BACKOFF_BASE_SECONDS = 0.5      # Doubled on every retry (with jitter)
+OPENAI_BACKOFF_MAX_SECONDS = 8
+OPENAI_MAX_CONCURRENCY = 16            # Calls in flight at once (also the HTTP connection pool size)
+OPENAI_CIRCUIT_FAILURE_THRESHOLD = 5   # Consecutive failed calls that open the circuit
+OPENAI_CIRCUIT_RESET_SECONDS = 30      # Time the circuit stays open before a trial call
+
+# Database connection pool and employee data cache
+DB_POOL_MAX_SIZE = 10
+DB_POOL_TIMEOUT_SECONDS = 5
+DB_POOL_HEALTH_CHECK_AFTER_SECONDS = 30  # Idle time after which a connection is re-checked
+EMPLOYEE_CACHE_TTL_SECONDS = 15 * 60
+EMPLOYEE_CACHE_MAX_ENTRIES = 10000
\ No newline at end of file
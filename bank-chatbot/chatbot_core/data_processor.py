@@ -0,0 +1,496 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import queue
+import threading
+from collections import namedtuple
+from contextlib import nullcontext
+from concurrent.futures import Future
+import fitz
+import faiss
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from .config import (
+    PDF_PATH, EMBEDDING_MODEL_NAME, INDEX_CACHE_DIR, INDEX_CACHE_VERSION, INDEX_TYPE,
+    INDEX_KEEP_GENERATIONS, INDEX_GENERATION_GRACE_SECONDS, INDEX_REFRESH_SECONDS,
+    QUERY_BATCH_MAX_SIZE, QUERY_BATCH_MAX_WAIT_MS, RETRIEVAL_MODE, RETRIEVAL_CANDIDATES, RERANKER_MODEL_NAME
+)
+from .ann_index import (
+    get_index_key, build_search_index, attach_store, set_search_params, STORE_READ_FLAGS, SEARCH_READ_FLAGS
+)
+from .chunker import Chunker
+from .hybrid_search import BM25Index, CrossEncoderReranker, StageTimer, reciprocal_rank_fusion, timed
+
+# --- PDF Processing and Embedding ---
+text_chunks = {}  # chunk id -> chunk text
+model = None
+index = None  # Search index (INDEX_TYPE), derived from the flat store index
+keyword_index = None  # BM25 index over the same chunks (RETRIEVAL_MODE = "hybrid")
+reranker = None  # Optional cross-encoder (RERANKER_MODEL_NAME)
+stage_timer = StageTimer()  # Per-stage retrieval latencies
+last_reindex_stats = {"added": 0, "removed": 0, "reused": 0}
+live_generation_dir = None
+reindex_listeners = []  # Called with the stats whenever a reindex swaps in a different index
+
+# Context retrieved for a question, with the query embedding, the ids of the chunks used
+# and the seconds spent in every retrieval stage.
+Retrieval = namedtuple("Retrieval", ["context", "embedding", "chunk_ids", "timings"], defaults=(None,))
+
+_reindex_lock = threading.Lock()
+_last_refresh_check = 0.0
+
+NO_INFORMATION = "No information available from the document."
+FALLBACK_CHUNK = "Could not load the PDF document or process the information. Please contact support."
+
+# Store layout: <INDEX_CACHE_DIR>/<store key>/CURRENT points at the live generation directory,
+# which holds the chunk texts, the page manifest, the flat FAISS store index and
+# any approximate search indexes derived from it.
+CURRENT_FILE = "CURRENT"
+CHUNKS_FILE = "chunks.json"
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+
+def get_store_dir(model_name=EMBEDDING_MODEL_NAME):
+    """Returns the store directory for the embedding model and cache version."""
+    key = hashlib.sha256(f"v{INDEX_CACHE_VERSION}:{model_name}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(INDEX_CACHE_DIR, key)
+
+def read_pdf_paragraphs(pdf_path=PDF_PATH):
+    """Returns the paragraphs (PyMuPDF text blocks) of every page, each as a list of lines."""
+    with fitz.open(pdf_path) as doc:
+        return [[block[4].split('\n') for block in page.get_text("blocks") if block[6] == 0] for page in doc]
+
+def get_chunker():
+    """Chunker measuring chunk lengths with the embedding model's tokenizer."""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        return Chunker()
+    return Chunker(count_tokens=lambda text: len(tokenizer.tokenize(text)))
+
+def source_fingerprint(pdf_path, chunker):
+    """Hash of the PDF bytes and the chunker settings: equal fingerprints produce equal chunks."""
+    digest = hashlib.sha256(json.dumps({
+        "strategy": chunker.strategy, "target_tokens": chunker.target_tokens,
+        "overlap_tokens": chunker.overlap_tokens, "min_chars": chunker.min_chars,
+        "boilerplate_page_fraction": chunker.boilerplate_page_fraction,
+        "dedup_similarity": chunker.dedup_similarity
+    }, sort_keys=True).encode("utf-8"))
+    with open(pdf_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def extract_pages(pdf_path=PDF_PATH, chunker=None):
+    """Extracts the chunks of every page (see chunker.py), keyed by a hash of the page's chunks."""
+    chunker = chunker or get_chunker()
+    pages = []
+    for chunks in chunker.chunk_pages(read_pdf_paragraphs(pdf_path)):
+        page_hash = hashlib.sha256("\n".join(chunks).encode("utf-8")).hexdigest()
+        pages.append((page_hash, chunks))
+    return pages
+
+def empty_manifest():
+    return {"next_id": 0, "pages": {}}
+
+def read_current(store_dir):
+    """Name of the live generation, or None if there is none."""
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE), 'r') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def load_store(store_dir, attempts=3):
+    """Loads the chunk texts and manifest of the live generation, or None if there is none."""
+    for attempt in range(attempts):
+        generation = read_current(store_dir)
+        if generation is None:
+            return None
+        generation_dir = os.path.join(store_dir, generation)
+        try:
+            with open(os.path.join(generation_dir, CHUNKS_FILE), 'r', encoding='utf-8') as f:
+                chunks = {int(chunk_id): text for chunk_id, text in json.load(f).items()}
+            with open(os.path.join(generation_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            return generation_dir, chunks, manifest
+        except FileNotFoundError:
+            # Pruned after CURRENT moved on (only past the grace period): read CURRENT again.
+            if attempt == attempts - 1:
+                raise
+
+def generation_time_ns(name):
+    try:
+        return int(name.split("-")[1])
+    except (IndexError, ValueError):
+        return 0
+
+def prune_generations(store_dir, live_generation):
+    """
+    Deletes superseded generations that are neither among the newest INDEX_KEEP_GENERATIONS
+    nor younger than INDEX_GENERATION_GRACE_SECONDS. Workers that read CURRENT just before it
+    moved may still be opening the previous generation, so it is never deleted right away.
+    """
+    generations = sorted((name for name in os.listdir(store_dir) if name.startswith("gen-")),
+                         key=generation_time_ns, reverse=True)
+    cutoff_ns = time.time_ns() - int(INDEX_GENERATION_GRACE_SECONDS * 1e9)
+    for name in generations[INDEX_KEEP_GENERATIONS:]:
+        if name != live_generation and generation_time_ns(name) < cutoff_ns:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+def read_store_index(generation_dir, writable=False):
+    """Reads the FAISS index of a generation; read-only indexes are memory-mapped."""
+    path = os.path.join(generation_dir, INDEX_FILE)
+    if writable:
+        return faiss.read_index(path)
+    return faiss.read_index(path, STORE_READ_FLAGS)
+
+def save_store(store_dir, chunks, manifest, store_index):
+    """
+    Writes a new generation directory and atomically points CURRENT at it,
+    so readers only ever see a complete, consistent set of artifacts.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    generation = f"gen-{time.time_ns()}-{os.getpid()}"
+    generation_dir = os.path.join(store_dir, generation)
+    os.makedirs(generation_dir)
+    with open(os.path.join(generation_dir, CHUNKS_FILE), 'w', encoding='utf-8') as f:
+        json.dump({str(chunk_id): text for chunk_id, text in chunks.items()}, f, ensure_ascii=False)
+    with open(os.path.join(generation_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    faiss.write_index(store_index, os.path.join(generation_dir, INDEX_FILE))
+
+    tmp_current = os.path.join(store_dir, f"{CURRENT_FILE}.tmp-{os.getpid()}")
+    with open(tmp_current, 'w') as f:
+        f.write(generation)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_current, os.path.join(store_dir, CURRENT_FILE))
+
+    prune_generations(store_dir, generation)
+    return generation_dir
+
+def load_search_index(generation_dir, store_index, index_type=INDEX_TYPE):
+    """
+    Returns the search index of the configured type for a generation. Approximate
+    indexes are trained and built once from the store vectors and cached next to it.
+    Falls back to the exact flat index when the approximate one cannot be built.
+    """
+    if index_type == "flat":
+        return store_index
+    path = os.path.join(generation_dir, f"search-{get_index_key(index_type)}.faiss")
+    try:
+        if not os.path.exists(path):
+            tmp_path = f"{path}.tmp-{os.getpid()}"
+            faiss.write_index(build_search_index(store_index, index_type), tmp_path)
+            os.replace(tmp_path, path)
+        search_index = faiss.read_index(path, SEARCH_READ_FLAGS)  # Mapped, like every other worker's copy
+    except Exception as e:
+        print(f"Warning: Could not build the '{index_type}' search index, using exact search instead. Details: {e}")
+        return store_index
+    return set_search_params(attach_store(search_index, store_index, index_type))
+
+def new_index():
+    """Creates an empty flat L2 index addressed by chunk id."""
+    dimension = model.get_sentence_embedding_dimension()
+    return faiss.IndexIDMap(faiss.IndexFlatL2(dimension))
+
+def build_fallback_index():
+    """Builds a one-chunk index used when the PDF cannot be processed."""
+    chunks = {0: FALLBACK_CHUNK}
+    fallback_index = new_index()
+    embeddings = np.asarray(model.encode([FALLBACK_CHUNK]), dtype='float32')
+    fallback_index.add_with_ids(embeddings, np.array([0], dtype='int64'))
+    return chunks, fallback_index
+
+def sync_index(pages, chunks, manifest, store_index):
+    """
+    Brings the store in line with the current pages: chunks of removed pages are deleted
+    from the index, chunks of new or changed pages are embedded and added, and
+    unchanged pages are reused as-is. Returns the added/removed/reused counts.
+    """
+    stats = {"added": 0, "removed": 0, "reused": 0}
+    known_pages = manifest["pages"]
+    current_hashes = {page_hash for page_hash, _ in pages}
+
+    removed_ids = []
+    for page_hash in [h for h in known_pages if h not in current_hashes]:
+        removed_ids.extend(known_pages.pop(page_hash))
+    if removed_ids:
+        store_index.remove_ids(np.array(removed_ids, dtype='int64'))
+        for chunk_id in removed_ids:
+            chunks.pop(chunk_id, None)
+        stats["removed"] = len(removed_ids)
+
+    new_texts = []
+    new_ids = []
+    for page_hash, page_chunks in pages:
+        if page_hash in known_pages:
+            stats["reused"] += len(known_pages[page_hash])
+            continue
+        ids = list(range(manifest["next_id"], manifest["next_id"] + len(page_chunks)))
+        manifest["next_id"] += len(page_chunks)
+        known_pages[page_hash] = ids
+        new_texts.extend(page_chunks)
+        new_ids.extend(ids)
+
+    if new_texts:
+        embeddings = np.asarray(model.encode(new_texts), dtype='float32')
+        store_index.add_with_ids(embeddings, np.array(new_ids, dtype='int64'))
+        chunks.update(zip(new_ids, new_texts))
+        stats["added"] = len(new_texts)
+    return stats
+
+def no_timing(phase):
+    return nullcontext()
+
+def reindex(pdf_path=PDF_PATH, timed_phase=no_timing):
+    """
+    Incrementally re-indexes the PDF against the on-disk store and swaps the
+    live chunks and index. Returns the added/removed/reused chunk counts.
+    The PDF is only extracted and chunked when its bytes or the chunker settings
+    differ from the ones the live generation was built from.
+    `timed_phase` is a context manager factory used to time each step.
+    """
+    with _reindex_lock:
+        store_dir = get_store_dir()
+        chunker = get_chunker()
+        with timed_phase("hash_pdf"):
+            fingerprint = source_fingerprint(pdf_path, chunker)
+        with timed_phase("load_store"):
+            stored = load_store(store_dir)
+            unchanged = stored is not None and stored[2].get("source_hash") == fingerprint
+            if stored is None:
+                chunks, manifest, store_index = {}, empty_manifest(), new_index()
+            else:
+                generation_dir, chunks, manifest = stored
+                store_index = read_store_index(generation_dir, writable=not unchanged)
+
+        if unchanged:
+            stats = {"added": 0, "removed": 0, "reused": len(chunks)}
+        else:
+            with timed_phase("extract_pdf"):
+                pages = extract_pages(pdf_path, chunker)
+            with timed_phase("embed_changes"):
+                stats = sync_index(pages, chunks, manifest, store_index)
+            manifest["source_hash"] = fingerprint
+            manifest["chunker_stats"] = chunker.last_stats
+            with timed_phase("save_store"):
+                generation_dir = save_store(store_dir, chunks, manifest, store_index)
+                store_index = read_store_index(generation_dir)  # Mapped, instead of the in-memory copy
+        # Boilerplate lines and duplicates dropped by the chunker
+        stats.update(manifest.get("chunker_stats", {}))
+        swapped = activate_generation(generation_dir, chunks, store_index, stats, timed_phase)
+
+    if swapped:
+        for listener in reindex_listeners:
+            listener(stats)
+    return stats
+
+def activate_generation(generation_dir, chunks, store_index, stats, timed_phase=no_timing):
+    """Builds the search indexes of a loaded generation and swaps them in. Returns whether it changed."""
+    global text_chunks, index, keyword_index, last_reindex_stats, live_generation_dir
+    with timed_phase("search_index"):
+        search_index = load_search_index(generation_dir, store_index)
+    if RETRIEVAL_MODE == "hybrid":
+        with timed_phase("keyword_index"):
+            new_keyword_index = BM25Index(chunks)
+    else:
+        new_keyword_index = None
+    swapped = generation_dir != live_generation_dir
+    text_chunks, index, keyword_index = chunks, search_index, new_keyword_index
+    last_reindex_stats, live_generation_dir = stats, generation_dir
+    return swapped
+
+def refresh_from_current():
+    """
+    Loads the generation CURRENT points at when another worker published it (for example
+    through /admin/reindex). Checked at most every INDEX_REFRESH_SECONDS; the load runs on a
+    background thread so requests keep using the live index meanwhile.
+    """
+    global _last_refresh_check
+    now = time.monotonic()
+    if live_generation_dir is None or now - _last_refresh_check < INDEX_REFRESH_SECONDS:
+        return
+    _last_refresh_check = now
+    store_dir = os.path.dirname(live_generation_dir)
+    if read_current(store_dir) not in (None, os.path.basename(live_generation_dir)):
+        threading.Thread(target=_load_current, args=(store_dir,), name="index-refresh", daemon=True).start()
+
+def _load_current(store_dir):
+    if not _reindex_lock.acquire(blocking=False):
+        return  # A reindex in this worker is already running
+    try:
+        stored = load_store(store_dir)
+        if stored is None:
+            return
+        generation_dir, chunks, manifest = stored
+        stats = {**manifest.get("chunker_stats", {}), "added": 0, "removed": 0, "reused": len(chunks)}
+        swapped = activate_generation(generation_dir, chunks, read_store_index(generation_dir), stats)
+    except Exception as e:
+        print(f"Error loading the index generation published by another worker: {e}")
+        return
+    finally:
+        _reindex_lock.release()
+    if swapped:
+        print(f"Loaded index generation {os.path.basename(generation_dir)} published by another worker.")
+        for listener in reindex_listeners:
+            listener(stats)
+
+def on_reindex(listener):
+    """Registers a callback run after every reindex that swapped in a different index."""
+    reindex_listeners.append(listener)
+    return listener
+
+def initialize_data(component=None):
+    """
+    Initializes and loads the PDF data and FAISS index, reusing the on-disk store when possible.
+    When given, `component` (a startup.Component) records phase timings and fallbacks.
+    """
+    global text_chunks, model, index, keyword_index, reranker
+    timed_phase = component.timed_phase if component else no_timing
+    with timed_phase("embedding_model"):
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    if RERANKER_MODEL_NAME:
+        try:
+            with timed_phase("reranker"):
+                from sentence_transformers import CrossEncoder
+                reranker = CrossEncoderReranker(CrossEncoder(RERANKER_MODEL_NAME))
+        except Exception as e:
+            print(f"Error loading reranker '{RERANKER_MODEL_NAME}', retrieving without it: {e}")
+    try:
+        stats = reindex(timed_phase=timed_phase)
+        if not text_chunks:
+            print("Warning: No significant text chunks extracted from the PDF. Check the PDF content or the chunking logic.")
+            text_chunks, index = build_fallback_index()
+            keyword_index = None
+            if component:
+                component.mark_degraded("No text chunks extracted from the PDF.")
+            return
+        print(f"Loaded {len(text_chunks)} text chunks from the PDF "
+              f"({stats['added']} added, {stats['removed']} removed, {stats['reused']} reused).")
+    except Exception as e:
+        print(f"Error processing PDF or generating embeddings: {e}")
+        text_chunks, index = build_fallback_index()
+        keyword_index = None
+        if component:
+            component.mark_degraded(e)
+
+def find_similar_chunks_batch(questions, k=4):
+    """
+    Embeds the questions as one batch and searches them with a single index call.
+    In hybrid mode the vector candidates are fused with BM25 candidates by reciprocal
+    rank, and the reranker (when configured) reorders the fused candidates.
+    Returns the query embeddings, for each question the (id, text) pairs of the
+    matching chunks (or None when there is no data), and for each question the
+    seconds spent per stage. Batch-wide stages count in full for every question.
+    """
+    chunks, search_index, keywords, cross_encoder = text_chunks, index, keyword_index, reranker
+    batch_timings = {}
+    with timed(batch_timings, "embed"):
+        q_embeds = np.asarray(model.encode(questions), dtype='float32')
+    if not chunks:
+        return q_embeds, [None] * len(questions), [dict(batch_timings) for _ in questions]
+    n_candidates = max(k, RETRIEVAL_CANDIDATES) if keywords or cross_encoder else k
+    with timed(batch_timings, "vector_search"):
+        D, I = search_index.search(q_embeds, k=n_candidates)
+
+    results, timings = [], []
+    for question, row in zip(questions, I):
+        question_timings = dict(batch_timings)
+        ranking = [int(i) for i in row if i in chunks]
+        if keywords is not None:
+            with timed(question_timings, "bm25_search"):
+                keyword_ranking = [chunk_id for chunk_id, _ in keywords.search(question, n_candidates)]
+            with timed(question_timings, "fusion"):
+                ranking = reciprocal_rank_fusion([ranking, keyword_ranking])[:n_candidates]
+        found = [(chunk_id, chunks[chunk_id]) for chunk_id in ranking if chunk_id in chunks]
+        if cross_encoder is not None and len(found) > 1:
+            with timed(question_timings, "rerank"):
+                found = cross_encoder.rerank(question, found)
+        results.append(found[:k])
+        timings.append(question_timings)
+    return q_embeds, results, timings
+
+class QueryBatcher:
+    """
+    Collects concurrent questions for up to max_wait_ms (or until max_batch_size
+    are waiting), embeds and searches them as one batch on a worker thread, and
+    hands each caller its own result.
+    """
+
+    def __init__(self, max_batch_size=QUERY_BATCH_MAX_SIZE, max_wait_ms=QUERY_BATCH_MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, question, k=4):
+        """Queues a question and returns a Future resolving to its Retrieval."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((question, k, future, time.perf_counter()))
+        return future
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+                    self._worker.start()
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            try:
+                # One search with the largest k, trimmed per request afterwards.
+                max_k = max(k for _, k, _, _ in batch)
+                q_embeds, results, timings = find_similar_chunks_batch([question for question, _, _, _ in batch], k=max_k)
+                for (_, k, future, submitted), q_embed, found, stages in zip(batch, q_embeds, results, timings):
+                    stages = {"batch_wait": started - submitted, **stages,
+                              "total": time.perf_counter() - submitted}
+                    for stage, seconds in stages.items():
+                        stage_timer.record(stage, seconds)
+                    if found is None:
+                        future.set_result(Retrieval(NO_INFORMATION, q_embed, [], stages))
+                    else:
+                        found = found[:k]
+                        future.set_result(Retrieval("\n".join(text for _, text in found), q_embed,
+                                                    [chunk_id for chunk_id, _ in found], stages))
+            except Exception as e:
+                for _, _, future, _ in batch:
+                    future.set_exception(e)
+
+query_batcher = QueryBatcher()
+
+def retrieve(question, k=4):
+    """Returns the Retrieval for a question (micro-batched with concurrent requests)."""
+    refresh_from_current()
+    return query_batcher.submit(question, k).result()
+
+def search_similar_chunks(question, k=4):
+    """Searches for similar text chunks in the PDF embeddings."""
+    return retrieve(question, k).context
+
+if __name__ == "__main__":
+    # Usage: python -m chatbot_core.data_processor [pdf_path]
+    # Prints the added/removed/reused counts of the (re)index run.
+    initialize_data()
+    print(json.dumps(reindex(sys.argv[1]) if len(sys.argv) > 1 else last_reindex_stats))
@@ -0,0 +1,111 @@
+import pyodbc
+from .config import (
+    DB_CONFIG, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT_SECONDS, DB_POOL_HEALTH_CHECK_AFTER_SECONDS,
+    EMPLOYEE_CACHE_TTL_SECONDS, EMPLOYEE_CACHE_MAX_ENTRIES
+)
+from .db_pool import ConnectionPool, PoolTimeoutError, TTLCache
+
+# Constant query texts let the driver and SQL Server reuse the prepared statements.
+VERIFY_QUERY = "SELECT EmployeeID FROM EmployeeTable WHERE IDNumber = ? AND EmployeeCode = ?"
+BULK_VERIFY_QUERY = "SELECT IDNumber, EmployeeCode, EmployeeID FROM EmployeeTable WHERE IDNumber IN ({placeholders})"
+EMPLOYEE_DATA_QUERY = "SELECT HireDate, Department FROM EmployeeTable WHERE EmployeeID = ?"
+
+# SQL Server accepts at most 2100 parameters per statement.
+BULK_VERIFY_CHUNK_SIZE = 500
+
+def get_db_connection():
+    """Establishes a connection to the SQL Server database."""
+    conn_str = (
+        f"DRIVER={DB_CONFIG['driver']};"
+        f"SERVER={DB_CONFIG['server']};"
+        f"DATABASE={DB_CONFIG['database']};"
+        f"UID={DB_CONFIG['uid']};"
+        f"PWD={DB_CONFIG['pwd']};"
+    )
+    try:
+        return pyodbc.connect(conn_str)
+    except pyodbc.Error as ex:
+        sqlstate = ex.args[0]
+        print(f"Database connection error: {sqlstate} - {ex}")
+        raise
+
+db_pool = ConnectionPool(
+    get_db_connection,
+    max_size=DB_POOL_MAX_SIZE,
+    timeout=DB_POOL_TIMEOUT_SECONDS,
+    health_check_after=DB_POOL_HEALTH_CHECK_AFTER_SECONDS
+)
+employee_data_cache = TTLCache(EMPLOYEE_CACHE_TTL_SECONDS, EMPLOYEE_CACHE_MAX_ENTRIES)
+
+def verify_employee_identity(employee_id_number, employee_code):
+    """
+    Verifies employee identity against the database.
+    (Fictitious table and column names)
+    """
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(VERIFY_QUERY, (employee_id_number, employee_code))
+            result = cursor.fetchone()
+            if result:
+                return result[0]
+            else:
+                return None
+    except pyodbc.Error as ex:
+        print(f"SQL query error during verification: {ex}")
+        return None
+    except PoolTimeoutError as ex:
+        print(f"Database connection error: {ex}")
+        return None
+
+def verify_employee_identities(credentials):
+    """
+    Verifies many (id number, employee code) pairs with one query per chunk.
+    Returns a dict mapping each verified pair to its EmployeeID; unverified pairs are omitted.
+    """
+    credentials = [(str(id_number), str(code)) for id_number, code in credentials]
+    wanted = set(credentials)
+    verified = {}
+    id_numbers = sorted({id_number for id_number, _ in credentials})
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(id_numbers), BULK_VERIFY_CHUNK_SIZE):
+                chunk = id_numbers[start:start + BULK_VERIFY_CHUNK_SIZE]
+                cursor.execute(BULK_VERIFY_QUERY.format(placeholders=", ".join("?" * len(chunk))), chunk)
+                for id_number, code, employee_id in cursor.fetchall():
+                    pair = (str(id_number), str(code))
+                    if pair in wanted:
+                        verified[pair] = employee_id
+    except pyodbc.Error as ex:
+        print(f"SQL query error during bulk verification: {ex}")
+    except PoolTimeoutError as ex:
+        print(f"Database connection error: {ex}")
+    return verified
+
+def get_employee_data(employee_id):
+    """
+    Retrieves specific employee data from the database.
+    Results are cached for EMPLOYEE_CACHE_TTL_SECONDS.
+    (Fictitious table and column names)
+    """
+    cached = employee_data_cache.get(employee_id)
+    if cached is not None:
+        return dict(cached)
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(EMPLOYEE_DATA_QUERY, (employee_id,))
+            result = cursor.fetchone()
+            if result:
+                data = {"hire_date": result[0].strftime("%Y-%m-%d"), "department": result[1]}
+                employee_data_cache.put(employee_id, data)
+                return dict(data)
+            else:
+                return {}
+    except pyodbc.Error as ex:
+        print(f"SQL query error during data retrieval: {ex}")
+        return {}
+    except PoolTimeoutError as ex:
+        print(f"Database connection error: {ex}")
+        return {}
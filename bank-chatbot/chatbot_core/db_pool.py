@@ -0,0 +1,121 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    `connect` is any zero-argument callable returning a new connection (pyodbc,
+    sqlite3, ...). At most `max_size` connections are open at once. Connections
+    idle for longer than `health_check_after` seconds are checked with
+    `health_check_query` before being handed out, and broken ones are replaced.
+    A connection whose use raised an exception is discarded instead of being
+    returned to the pool, so the next checkout reconnects.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=5.0, health_check_query="SELECT 1", health_check_after=30.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_query = health_check_query
+        self.health_check_after = health_check_after
+        self._idle = queue.LifoQueue()  # (connection, last_used)
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @contextmanager
+    def connection(self):
+        """Checks out a healthy connection for the duration of the with-block."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeoutError(f"No database connection available after {self.timeout} seconds.")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except BaseException:
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put((conn, time.monotonic()))
+            self._slots.release()
+
+    def _checkout(self):
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < self.health_check_after or self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def _is_healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_check_query)
+            cursor.fetchall()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _discard(conn):
+        if conn is None:
+            return
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Closes every idle connection."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+class TTLCache:
+    """Small thread-safe cache whose entries expire after `ttl_seconds`."""
+
+    def __init__(self, ttl_seconds, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                now = time.monotonic()
+                for expired_key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                    del self._entries[expired_key]
+                if len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]  # Oldest insertion
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self, key=None):
+        """Drops one entry, or every entry when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
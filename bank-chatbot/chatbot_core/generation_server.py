@@ -0,0 +1,342 @@
+"""
+In-process continuous-batching text generation for the local LLM.
+
+A single worker thread owns the model. Requests are queued and join the running
+batch at the next decoding step (iteration-level scheduling): new prompts are
+prefilled together, their key/value caches are left-padded and merged into the
+running batch, and finished sequences leave the batch right away, so short and
+long prompts share the model without waiting for each other.
+
+Benchmark with a tiny model:
+    python -m chatbot_core.generation_server --model sshleifer/tiny-gpt2 --concurrency 1 2 4 8
+"""
+import time
+import queue
+import threading
+from concurrent.futures import Future, InvalidStateError
+import torch
+from .config import (
+    LLM_MAX_NEW_TOKENS, LLM_TEMPERATURE, LLM_TOP_K, LLM_TOP_P,
+    LLM_MAX_BATCH_SIZE, LLM_KV_CACHE_TOKEN_BUDGET
+)
+
+try:
+    from transformers import DynamicCache
+except ImportError:  # Older transformers only accept tuple caches
+    DynamicCache = None
+
+def to_legacy_cache(past_key_values):
+    """Returns the cache as a tuple of per-layer (key, value) tensors of shape [batch, heads, seq, dim]."""
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    return past_key_values
+
+def from_legacy_cache(layers):
+    if DynamicCache is not None and hasattr(DynamicCache, "from_legacy_cache"):
+        return DynamicCache.from_legacy_cache(layers)
+    return layers
+
+def left_pad(tensor, length, dim, value=0):
+    """Left-pads a tensor with `value` along `dim` up to `length`."""
+    missing = length - tensor.shape[dim]
+    if missing <= 0:
+        return tensor
+    pad_shape = list(tensor.shape)
+    pad_shape[dim] = missing
+    return torch.cat([tensor.new_full(pad_shape, value), tensor], dim=dim)
+
+class GenerationFuture(Future):
+    """
+    Future of a generation. Once admitted to the batch it is running, so Future.cancel() no
+    longer applies; cancel() also sets a flag the scheduler checks at every decoding step.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cancel_requested = False
+
+    def cancel(self):
+        self.cancel_requested = True
+        return super().cancel()
+
+class GenerationRequest:
+    def __init__(self, prompt_ids, max_new_tokens, streamer):
+        self.prompt_ids = prompt_ids
+        self.max_new_tokens = max_new_tokens
+        self.streamer = streamer
+        self.generated = []
+        self.future = GenerationFuture()
+
+    @property
+    def reserved_tokens(self):
+        return len(self.prompt_ids) + self.max_new_tokens
+
+    @property
+    def cancelled(self):
+        return self.future.cancel_requested
+
+class ContinuousBatchingGenerator:
+    """
+    Text generator backed by a continuous-batching scheduler.
+
+    At most `max_batch_size` sequences decode together, and a request is only
+    admitted while the prompt + max_new_tokens of every running sequence fits in
+    `kv_cache_token_budget` (a request larger than the budget runs alone).
+    """
+
+    def __init__(self, model, tokenizer, max_batch_size=LLM_MAX_BATCH_SIZE,
+                 kv_cache_token_budget=LLM_KV_CACHE_TOKEN_BUDGET, max_new_tokens=LLM_MAX_NEW_TOKENS,
+                 temperature=LLM_TEMPERATURE, top_k=LLM_TOP_K, top_p=LLM_TOP_P):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.kv_cache_token_budget = kv_cache_token_budget
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.top_k = top_k
+        self.top_p = top_p
+        self.device = next(model.parameters()).device
+        self.eos_token_id = tokenizer.eos_token_id
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else (self.eos_token_id or 0)
+        self.generated_tokens = 0
+
+        self._pending = queue.Queue()
+        self._waiting = None  # Request that did not fit in the budget yet
+        self._reset_batch()
+        self._worker = threading.Thread(target=self._run, name="generation-server", daemon=True)
+        self._worker.start()
+
+    # --- Public interface ---
+
+    def submit(self, prompt_text, streamer=None, max_new_tokens=None):
+        """
+        Queues a prompt and returns a Future resolving to the generated text (without the prompt).
+        If given, `streamer` receives every generated token id via put() and end() when done.
+        Cancelling the Future stops the generation at the next decoding step.
+        """
+        prompt_ids = self.tokenizer(prompt_text, add_special_tokens=False)["input_ids"]
+        request = GenerationRequest(prompt_ids, max_new_tokens or self.max_new_tokens, streamer)
+        self._pending.put(request)
+        return request.future
+
+    def generate(self, prompt_text, streamer=None, max_new_tokens=None):
+        """Generates the continuation of a prompt, blocking until it is complete."""
+        return self.submit(prompt_text, streamer, max_new_tokens).result()
+
+    @property
+    def active_requests(self):
+        """Approximate number of queued and running requests."""
+        return self._pending.qsize() + len(self._requests) + (self._waiting is not None)
+
+    # --- Scheduler ---
+
+    def _reset_batch(self):
+        self._requests = []        # Running requests, one per batch row
+        self._cache = None         # Tuple of per-layer (key, value)
+        self._attention_mask = None
+        self._next_tokens = None   # Last sampled token of every row, not yet fed to the model
+        self._reserved_tokens = 0
+
+    def _run(self):
+        while True:
+            admitted = self._admit()
+            try:
+                with torch.inference_mode():
+                    if admitted:
+                        self._prefill(admitted)
+                    if self._requests:
+                        self._decode_step()
+            except Exception as e:
+                print(f"Error in the generation server: {e}")
+                for request in self._requests + admitted:
+                    self._finish(request, error=e)
+                self._reset_batch()
+
+    def _admit(self):
+        """Takes queued requests that fit in the batch and the KV budget (blocks when idle)."""
+        admitted = []
+        while len(self._requests) + len(admitted) < self.max_batch_size:
+            request = self._waiting
+            self._waiting = None
+            if request is None:
+                try:
+                    idle = not self._requests and not admitted
+                    request = self._pending.get(block=idle)
+                except queue.Empty:
+                    break
+            if request.cancelled:
+                self._finish(request)
+                continue
+            fits = self._reserved_tokens + request.reserved_tokens <= self.kv_cache_token_budget
+            if not fits and (self._requests or admitted):
+                self._waiting = request
+                break
+            # From here on only the scheduler resolves the future; a cancel() just sets the flag.
+            if not request.future.set_running_or_notify_cancel():
+                self._finish(request)
+                continue
+            self._reserved_tokens += request.reserved_tokens
+            admitted.append(request)
+        return admitted
+
+    def _forward(self, input_ids, attention_mask, position_ids, cache):
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=None if cache is None else from_legacy_cache(cache),
+            use_cache=True
+        )
+        return outputs.logits[:, -1, :], to_legacy_cache(outputs.past_key_values)
+
+    def _prefill(self, requests):
+        """Runs the new prompts as one left-padded batch and merges them into the running batch."""
+        length = max(len(r.prompt_ids) for r in requests)
+        input_ids = torch.full((len(requests), length), self.pad_token_id, dtype=torch.long, device=self.device)
+        attention_mask = torch.zeros((len(requests), length), dtype=torch.long, device=self.device)
+        for row, request in enumerate(requests):
+            input_ids[row, length - len(request.prompt_ids):] = torch.tensor(request.prompt_ids, device=self.device)
+            attention_mask[row, length - len(request.prompt_ids):] = 1
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+
+        logits, cache = self._forward(input_ids, attention_mask, position_ids, None)
+        next_tokens = self._sample(logits)
+
+        if self._requests:
+            length = max(self._attention_mask.shape[1], attention_mask.shape[1])
+            cache = tuple(
+                (torch.cat([left_pad(old_k, length, 2), left_pad(new_k, length, 2)]),
+                 torch.cat([left_pad(old_v, length, 2), left_pad(new_v, length, 2)]))
+                for (old_k, old_v), (new_k, new_v) in zip(self._cache, cache)
+            )
+            attention_mask = torch.cat([left_pad(self._attention_mask, length, 1), left_pad(attention_mask, length, 1)])
+            next_tokens = torch.cat([self._next_tokens, next_tokens])
+
+        self._requests = self._requests + requests
+        self._cache, self._attention_mask, self._next_tokens = cache, attention_mask, next_tokens
+        self._record(range(len(self._requests) - len(requests), len(self._requests)))
+
+    def _decode_step(self):
+        """Feeds the last sampled token of every running sequence and samples the next one."""
+        position_ids = self._attention_mask.sum(-1, keepdim=True)
+        attention_mask = torch.cat([self._attention_mask, self._attention_mask.new_ones((len(self._requests), 1))], dim=1)
+        logits, cache = self._forward(self._next_tokens[:, None], attention_mask, position_ids, self._cache)
+        self._cache, self._attention_mask, self._next_tokens = cache, attention_mask, self._sample(logits)
+        self._record(range(len(self._requests)))
+
+    def _record(self, rows):
+        """Appends the sampled tokens of the given rows and retires the finished sequences."""
+        finished = {}  # row -> error, if the request failed
+        for row in rows:
+            request = self._requests[row]
+            if request.cancelled:  # The caller gave up (e.g. timed out), free its batch slot
+                finished[row] = None
+                continue
+            token = int(self._next_tokens[row])
+            if token == self.eos_token_id:
+                finished[row] = None
+                continue
+            request.generated.append(token)
+            self.generated_tokens += 1
+            try:
+                if request.streamer is not None:
+                    request.streamer.put(torch.tensor([token]))
+            except Exception as e:  # Fails this request only, not the whole batch
+                finished[row] = e
+                continue
+            if len(request.generated) >= request.max_new_tokens:
+                finished[row] = None
+        if finished:
+            for row, error in finished.items():
+                self._finish(self._requests[row], error)
+            self._drop_rows(list(finished))
+
+    def _drop_rows(self, rows):
+        dropped = set(rows)
+        keep = [row for row in range(len(self._requests)) if row not in dropped]
+        if not keep:
+            self._reset_batch()
+            return
+        self._reserved_tokens -= sum(self._requests[row].reserved_tokens for row in rows)
+        index = torch.tensor(keep, device=self.device)
+        attention_mask = self._attention_mask.index_select(0, index)
+        # Drop the left padding no remaining sequence needs.
+        start = int((attention_mask.sum(0) > 0).nonzero()[0])
+        self._attention_mask = attention_mask[:, start:]
+        self._cache = tuple(
+            (k.index_select(0, index)[:, :, start:], v.index_select(0, index)[:, :, start:])
+            for k, v in self._cache
+        )
+        self._next_tokens = self._next_tokens.index_select(0, index)
+        self._requests = [self._requests[row] for row in keep]
+
+    def _finish(self, request, error=None):
+        """Ends the request's stream and resolves its future. Never raises, so one request cannot fail the batch."""
+        try:
+            if request.streamer is not None:
+                request.streamer.end()
+            if error is None:
+                result = self.tokenizer.decode(request.generated, skip_special_tokens=True)
+        except Exception as e:
+            error = error or e
+        if request.future.done():
+            return
+        try:
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+        except InvalidStateError:
+            pass  # Cancelled before it was admitted
+
+    def _sample(self, logits):
+        """Samples one token per row with temperature, top-k and top-p (greedy when temperature is 0)."""
+        if self.temperature <= 0:
+            return logits.argmax(-1)
+        logits = logits.float() / self.temperature
+        if self.top_k:
+            kth_best = torch.topk(logits, min(self.top_k, logits.shape[-1])).values[:, -1:]
+            logits = logits.masked_fill(logits < kth_best, float("-inf"))
+        if self.top_p < 1.0:
+            sorted_logits, sorted_index = torch.sort(logits, descending=True)
+            sorted_probs = sorted_logits.softmax(-1)
+            outside = sorted_probs.cumsum(-1) - sorted_probs > self.top_p
+            sorted_logits = sorted_logits.masked_fill(outside, float("-inf"))
+            logits = torch.full_like(logits, float("-inf")).scatter(-1, sorted_index, sorted_logits)
+        return torch.multinomial(logits.softmax(-1), 1).squeeze(-1)
+
+if __name__ == "__main__":
+    import argparse
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    parser = argparse.ArgumentParser(description="Tokens/s of the continuous-batching generator at several concurrency levels.")
+    parser.add_argument("--model", default="sshleifer/tiny-gpt2")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    bench_tokenizer = AutoTokenizer.from_pretrained(args.model)
+    bench_model = AutoModelForCausalLM.from_pretrained(args.model).eval()
+    prompts = [f"Pregunta {i}: " + "¿Cuántos días de vacaciones tengo? " * (1 + i % 5) for i in range(args.requests)]
+
+    for concurrency in args.concurrency:
+        generator = ContinuousBatchingGenerator(bench_model, bench_tokenizer, max_batch_size=concurrency,
+                                                max_new_tokens=args.max_new_tokens)
+        # Keep generating up to max_new_tokens so runs are comparable.
+        generator.eos_token_id = None
+        semaphore = threading.Semaphore(concurrency)
+
+        def run(prompt):
+            with semaphore:
+                generator.generate(prompt)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=run, args=(prompt,)) for prompt in prompts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        print(f"concurrency={concurrency:<3} requests={args.requests} tokens={generator.generated_tokens} "
+              f"time={elapsed:.2f}s tokens/s={generator.generated_tokens / elapsed:.1f}")
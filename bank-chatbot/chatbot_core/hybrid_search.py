@@ -0,0 +1,148 @@
+import re
+import math
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict, deque
+import numpy as np
+from .config import BM25_K1, BM25_B, RRF_K, RERANKER_CACHE_MAX_ENTRIES
+
+# Words too common to help ranking, without accents (tokens are accent-folded).
+STOPWORDS = frozenset("""
+a al ante con contra de del desde durante e el en entre es esta este esto hacia hasta la las le les lo los mas me mi
+mis no o para pero por que se si sin sobre su sus te tu un una uno unos unas y ya como cual cuando donde quien
+puedo tengo hay ser son fue the an and or of to in on for is are be do does how what when where which who my i
+""".split())
+
+TOKEN = re.compile(r"\w+")
+
+def tokenize(text):
+    """Lowercased, accent-folded word tokens without stopwords, so "préstamo" matches "prestamo"."""
+    folded = "".join(c for c in unicodedata.normalize("NFKD", text.lower()) if not unicodedata.combining(c))
+    return [token for token in TOKEN.findall(folded) if token not in STOPWORDS]
+
+class BM25Index:
+    """In-memory inverted index scoring chunks with Okapi BM25."""
+
+    def __init__(self, chunks, k1=BM25_K1, b=BM25_B):
+        """`chunks` maps chunk id -> chunk text."""
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(chunk id, term frequency)]
+        self.doc_lengths = {}
+        for chunk_id, text in chunks.items():
+            tokens = tokenize(text)
+            self.doc_lengths[chunk_id] = len(tokens)
+            counts = defaultdict(int)
+            for token in tokens:
+                counts[token] += 1
+            for token, tf in counts.items():
+                self.postings[token].append((chunk_id, tf))
+        n = len(self.doc_lengths)
+        self.avg_length = sum(self.doc_lengths.values()) / n if n else 0.0
+        self.idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()}
+
+    def search(self, query, k):
+        """Returns up to k (chunk id, score) pairs, best first. Only chunks sharing a term are scored."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[chunk_id] / self.avg_length)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuses ranked id lists: every list gives an id 1 / (k + rank). Returns ids, best first."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+class CrossEncoderReranker:
+    """
+    Reorders candidate chunks with a cross-encoder. Scores are cached per
+    (question, chunk text), so repeated questions skip the model entirely.
+    """
+
+    def __init__(self, model, max_entries=RERANKER_CACHE_MAX_ENTRIES):
+        self.model = model
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(question, text):
+        return hashlib.sha1(f"{' '.join(question.lower().split())}\x00{text}".encode("utf-8")).digest()
+
+    def rerank(self, question, candidates):
+        """`candidates` is a list of (chunk id, text). Returns them ordered by cross-encoder score."""
+        keys = [self._key(question, text) for _, text in candidates]
+        scores = [None] * len(candidates)
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        self.hits += len(candidates) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            predicted = self.model.predict([(question, candidates[i][1]) for i in missing])
+            with self._lock:
+                for i, score in zip(missing, predicted):
+                    scores[i] = float(score)
+                    self._cache[keys[i]] = scores[i]
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        order = np.argsort(scores)[::-1]
+        return [candidates[i] for i in order]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+class StageTimer:
+    """Keeps the latest per-request durations of every retrieval stage and reports their percentiles."""
+
+    def __init__(self, window=1000):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def report(self):
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "mean_ms": round(1000 * sum(values) / len(values), 3),
+                "p50_ms": round(1000 * values[len(values) // 2], 3),
+                "p99_ms": round(1000 * values[min(len(values) - 1, int(len(values) * 0.99))], 3)
+            }
+            for stage, values in samples.items() if values
+        }
+
+class timed:
+    """Context manager adding the elapsed time of a stage to a timings dict."""
+
+    def __init__(self, timings, stage):
+        self.timings = timings
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timings[self.stage] = self.timings.get(self.stage, 0.0) + time.perf_counter() - self.start
+        return False
@@ -0,0 +1,138 @@
+"""
+Routing accuracy and per-question latency of the intent router on a labeled question set.
+
+The legacy if/elif keyword chain is measured on the same sets for comparison.
+An expected intent of None means the question should reach the manual (retrieval + LLM).
+LABELED_QUESTIONS was written alongside the router's keyword lists; HELD_OUT_QUESTIONS was
+written without looking at them, so it shows how the router does on unseen phrasings.
+
+Usage:
+    python -m chatbot_core.intent_eval                 # keyword matching only
+    python -m chatbot_core.intent_eval --embeddings    # plus the embedding classifier (loads the model)
+"""
+import time
+import argparse
+from collections import Counter
+from .intent_router import IntentRouter
+
+LABELED_QUESTIONS = [
+    ("hola", "greeting"),
+    ("Hi!", "greeting"),
+    ("Hello there", "greeting"),
+    ("Buenos días", "greeting"),
+    ("buenas tardes, ¿cómo estás?", "greeting"),
+    ("¿Cómo solicito una carta de trabajo?", "work_letter"),
+    ("I need a work letter for my visa", "work_letter"),
+    ("Necesito una constancia de trabajo", "work_letter"),
+    ("¿Dónde pido mi carta laboral?", "work_letter"),
+    ("¿Cuántos días de vacaciones tengo?", "vacation"),
+    ("How many vacation days do I have?", "vacation"),
+    ("Quiero solicitar mis vacaciones", "vacation"),
+    ("¿Cuándo me toca la vacación?", "vacation"),
+    ("No me ha llegado el pago de vacaciones", "vacation_pay"),
+    ("When is vacation pay processed?", "vacation_pay"),
+    ("¿Cuándo pagan las vacaciones?", "vacation_pay"),
+    ("¿Cómo pido un préstamo personal?", "loan"),
+    ("Requisitos para un prestamo", "loan"),
+    ("Can I apply for a loan?", "loan"),
+    ("¿Cuándo se paga el bono de rendimiento?", "bonus"),
+    ("How is the bonus calculated?", "bonus"),
+    ("¿Qué es la bonificación anual?", "bonus"),
+    # Questions for the manual: several contain "hi", "pay" or a greeting inside other words
+    ("¿Qué dice el manual sobre el código de vestimenta?", None),
+    ("What is this policy about remote work?", None),
+    ("¿Dónde está el archivo de políticas internas?", None),
+    ("Which holidays are observed by the bank?", None),
+    ("¿Cuál es el horario de trabajo?", None),
+    ("How do I report a phishing email?", None),
+    ("¿Qué beneficios de salud tengo?", None),
+    ("Hola, ¿cuál es la política de teletrabajo del banco para empleados nuevos?", None),
+    ("What is the payroll schedule?", None),
+    ("¿Puedo trabajar desde casa los viernes?", None),
+    ("¿Cómo se calculan las horas extra?", None),
+    ("Explain the ethics hotline", None)
+]
+
+HELD_OUT_QUESTIONS = [
+    ("Good morning", "greeting"),
+    ("¿Qué tal?", "greeting"),
+    ("Hey there", "greeting"),
+    ("Hi, what is the dress code?", None),
+    ("Hola, ¿a qué hora abre la cafetería?", None),
+    ("Hey, how do I reset my password?", None),
+    ("Buenas, ¿quién aprueba las horas extra?", None),
+    ("I'd like to take some time off in December", "vacation"),
+    ("How much annual leave do new hires get?", "vacation"),
+    ("¿Cuántos días de descanso me tocan este año?", "vacation"),
+    ("My holiday pay is missing from my paycheck", "vacation_pay"),
+    ("¿Cuándo depositan el dinero de mis días de descanso?", "vacation_pay"),
+    ("Can HR give me proof of employment?", "work_letter"),
+    ("Necesito un certificado laboral para alquilar un apartamento", "work_letter"),
+    ("¿Ofrecen crédito hipotecario a los colaboradores?", "loan"),
+    ("Can I borrow money for a car through the bank?", "loan"),
+    ("Is there a year-end performance reward?", "bonus"),
+    ("¿Hay algún incentivo extra en diciembre?", "bonus"),
+    ("Who do I ask about parking spots?", None),
+    ("¿Qué pasa si llego tarde al trabajo?", None),
+    ("This week is hectic, what's the overtime policy?", None),
+    ("¿Cómo se paga la nómina quincenal?", None)
+]
+
+def legacy_route(question):
+    """The keyword chain ask() used before the intent router, kept for comparison."""
+    lower_q = question.lower().strip()
+    if "hello" in lower_q or "hi" in lower_q:
+        return "greeting"
+    if "work letter" in lower_q or "carta de trabajo" in lower_q:
+        return "work_letter"
+    if "vacation" in lower_q or "vacaciones" in lower_q:
+        if "pay" in lower_q or "pago de vacaciones" in lower_q:
+            return "vacation_pay"
+        return "vacation"
+    if "loan" in lower_q or "prestamo" in lower_q:
+        return "loan"
+    if "bono" in lower_q or "bonus" in lower_q:
+        return "bonus"
+    return None
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def evaluate(name, route, repeats, questions=LABELED_QUESTIONS):
+    """Prints the accuracy of route() on a labeled set and its p50/p99 latency in microseconds."""
+    correct = 0
+    errors = Counter()
+    latencies = []
+    for question, expected in questions:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predicted = route(question)
+            latencies.append((time.perf_counter() - start) * 1e6)
+        if predicted == expected:
+            correct += 1
+        else:
+            errors[(expected, predicted)] += 1
+    latencies.sort()
+    print(f"{name:<32} accuracy={correct / len(questions):.1%} ({correct}/{len(questions)}) "
+          f"p50={percentile(latencies, 0.50):.1f}us p99={percentile(latencies, 0.99):.1f}us")
+    for (expected, predicted), count in errors.most_common():
+        print(f"    expected {expected} -> got {predicted} (x{count})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy and latency of the intent router on a labeled question set.")
+    parser.add_argument("--embeddings", action="store_true", help="Also evaluate the embedding classifier fallback.")
+    parser.add_argument("--repeats", type=int, default=200, help="Timed routing calls per question.")
+    args = parser.parse_args()
+
+    question_sets = [("", LABELED_QUESTIONS), (" (held out)", HELD_OUT_QUESTIONS)]
+    for suffix, questions in question_sets:
+        evaluate("legacy keyword chain" + suffix, legacy_route, args.repeats, questions)
+        evaluate("intent router" + suffix, IntentRouter().route, args.repeats, questions)
+    if args.embeddings:
+        from sentence_transformers import SentenceTransformer
+        from .config import EMBEDDING_MODEL_NAME
+
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        router = IntentRouter(encode=lambda texts: model.encode(texts, normalize_embeddings=True))
+        for suffix, questions in question_sets:
+            evaluate("router + embeddings" + suffix, router.route, max(1, args.repeats // 20), questions)
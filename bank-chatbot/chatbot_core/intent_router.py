@@ -0,0 +1,164 @@
+import re
+import threading
+import unicodedata
+import numpy as np
+from .config import INTENT_EMBEDDING_THRESHOLD
+
+# Intents in priority order: when a question matches several, the first one wins.
+#   keywords   - words or phrases matched on word boundaries (case- and accent-insensitive)
+#   requires   - another intent that must also match (e.g. "pay" only counts next to "vacation")
+#   small_talk - words allowed next to the keywords; when set, the intent only matches
+#                questions made of nothing else (a greeting followed by a real question
+#                should still reach the other intents or the manual)
+#   exemplars  - sample questions for the optional embedding classifier
+INTENTS = [
+    {
+        "name": "vacation_pay",
+        "keywords": ["pay", "paid", "payment", "pago", "pagos", "pagan", "pagado", "pagadas"],
+        "requires": "vacation",
+        "exemplars": [
+            "¿Cuándo me pagan las vacaciones?",
+            "No he recibido el pago de mis vacaciones",
+            "When do I get my vacation pay?"
+        ]
+    },
+    {
+        "name": "vacation",
+        "keywords": ["vacation", "vacations", "vacacion", "vacaciones", "dias libres"],
+        "exemplars": [
+            "¿Cuántos días libres me corresponden al año?",
+            "Quiero pedir días de descanso anual",
+            "How many days off do I get per year?"
+        ]
+    },
+    {
+        "name": "work_letter",
+        "keywords": ["work letter", "employment letter", "carta de trabajo", "carta laboral", "constancia de trabajo"],
+        "exemplars": [
+            "Necesito un documento que certifique que trabajo en el banco",
+            "¿Cómo pido una constancia laboral?",
+            "I need a letter confirming my employment"
+        ]
+    },
+    {
+        "name": "loan",
+        "keywords": ["loan", "loans", "prestamo", "prestamos"],
+        "exemplars": [
+            "¿Puedo pedir dinero prestado al banco como empleado?",
+            "¿Cuáles son los requisitos para un crédito personal?",
+            "Can employees borrow money from the bank?"
+        ]
+    },
+    {
+        "name": "bonus",
+        "keywords": ["bonus", "bonuses", "bono", "bonos", "bonificacion"],
+        "exemplars": [
+            "¿Cuándo se reparte el incentivo por desempeño?",
+            "¿Cómo se calcula la gratificación anual?",
+            "When is the performance incentive paid?"
+        ]
+    },
+    {
+        "name": "greeting",
+        "keywords": ["hello", "hi", "hey", "hola", "buenos dias", "buenas tardes", "buenas noches", "buenas"],
+        "small_talk": ["there", "everyone", "team", "all", "good", "morning", "afternoon", "evening",
+                       "buen", "dia", "como", "estas", "esta", "que", "tal", "how", "are", "you", "saludos"],
+        "exemplars": [
+            "Hola, ¿cómo estás?",
+            "Buen día",
+            "Good morning"
+        ]
+    }
+]
+
+def normalize_text(text):
+    """Lowercases and strips accents, so "Préstamo" matches "prestamo"."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def compile_intent_pattern(intents):
+    """
+    Compiles every keyword into one regex with a named group per intent, so a question
+    is scanned once no matter how many intents there are. Longer phrases come first
+    within each group.
+    """
+    groups = []
+    for intent in intents:
+        keywords = sorted({normalize_text(k) for k in intent["keywords"]}, key=len, reverse=True)
+        groups.append(f"(?P<{intent['name']}>{'|'.join(re.escape(k) for k in keywords)})")
+    return re.compile(r"\b(?:" + "|".join(groups) + r")\b")
+
+class IntentRouter:
+    """
+    Routes a question to an intent name, or None when the question should go to the
+    retrieval + LLM path.
+
+    Keyword matching runs first. If nothing matches and `encode` is given (a function
+    returning unit-normalized embeddings for a list of texts, or None while the model is
+    still loading), the question goes to the intent whose exemplar is most similar,
+    provided the similarity reaches `threshold`.
+    """
+
+    def __init__(self, intents=INTENTS, encode=None, threshold=INTENT_EMBEDDING_THRESHOLD):
+        self.intents = intents
+        self.encode = encode
+        self.threshold = threshold
+        self._pattern = compile_intent_pattern(intents)
+        self._exemplar_embeddings = None
+        self._exemplar_intents = [intent["name"] for intent in intents for _ in intent.get("exemplars", ())]
+        self._small_talk = {
+            intent["name"]: {normalize_text(w) for phrase in intent["keywords"] + intent["small_talk"] for w in phrase.split()}
+            for intent in intents if intent.get("small_talk")
+        }
+        self._lock = threading.Lock()
+
+    def route(self, question):
+        intent = self.match_keywords(question)
+        if intent is None and self.encode is not None:
+            intent = self.classify(question)
+        return intent
+
+    def match_keywords(self, question):
+        text = normalize_text(question)
+        matched = {m.lastgroup for m in self._pattern.finditer(text)}
+        if not matched:
+            return None
+        for intent in self.intents:
+            if intent["name"] not in matched:
+                continue
+            if intent.get("requires") and intent["requires"] not in matched:
+                continue
+            if not self._is_small_talk(intent["name"], text):
+                continue
+            return intent["name"]
+        return None
+
+    def _is_small_talk(self, name, text):
+        """False when an intent with small_talk words is followed by anything else (a real question)."""
+        allowed = self._small_talk.get(name)
+        return allowed is None or all(word in allowed for word in re.findall(r"\w+", text))
+
+    def classify(self, question):
+        """Nearest-exemplar classification, or None when the model is not loaded or nothing is close enough."""
+        exemplar_embeddings = self._get_exemplar_embeddings()
+        if exemplar_embeddings is None:
+            return None
+        embeddings = self.encode([question])
+        if embeddings is None:
+            return None
+        scores = exemplar_embeddings @ np.asarray(embeddings[0], dtype='float32')
+        best = int(np.argmax(scores))
+        intent = self._exemplar_intents[best]
+        if scores[best] < self.threshold or not self._is_small_talk(intent, normalize_text(question)):
+            return None
+        return intent
+
+    def _get_exemplar_embeddings(self):
+        if self._exemplar_embeddings is None and self._exemplar_intents:
+            with self._lock:
+                if self._exemplar_embeddings is None:
+                    exemplars = [e for intent in self.intents for e in intent.get("exemplars", ())]
+                    embeddings = self.encode(exemplars)
+                    if embeddings is not None:
+                        self._exemplar_embeddings = np.asarray(embeddings, dtype='float32')
+        return self._exemplar_embeddings
@@ -0,0 +1,112 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM
+from .config import (
+    LLM_MODEL_NAME, LLM_PRECISION, LLM_GGUF_PATH, LLM_GGUF_THREADS, LLM_GGUF_CONTEXT_SIZE,
+    LLM_MAX_NEW_TOKENS, LLM_TEMPERATURE, LLM_TOP_K, LLM_TOP_P
+)
+from .generation_server import ContinuousBatchingGenerator
+
+PRECISIONS = ("auto", "fp16", "fp32", "bf16", "int8", "gguf")
+
+class LlamaCppGenerator:
+    """
+    GGUF (llama.cpp) text generator with the same submit()/generate() interface as
+    ContinuousBatchingGenerator. llama.cpp runs one prompt at a time, so requests
+    are served in order by a single worker thread.
+    """
+
+    def __init__(self, model_path=LLM_GGUF_PATH, n_threads=LLM_GGUF_THREADS, n_ctx=LLM_GGUF_CONTEXT_SIZE,
+                 max_new_tokens=LLM_MAX_NEW_TOKENS, temperature=LLM_TEMPERATURE, top_k=LLM_TOP_K, top_p=LLM_TOP_P):
+        from llama_cpp import Llama  # Optional dependency, only needed for the gguf mode
+
+        self.llm = Llama(model_path=model_path, n_threads=n_threads, n_ctx=n_ctx, verbose=False)
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.top_k = top_k
+        self.top_p = top_p
+        self.generated_tokens = 0
+        self.active_requests = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llama-cpp")
+        self._lock = threading.Lock()
+
+    def submit(self, prompt_text, streamer=None, max_new_tokens=None):
+        """
+        Queues a prompt and returns a Future resolving to the generated text.
+        If given, `streamer` (a TextIteratorStreamer) receives the text as it is generated.
+        """
+        with self._lock:
+            self.active_requests += 1
+        future = self._executor.submit(self._generate, prompt_text, streamer, max_new_tokens or self.max_new_tokens)
+        future.add_done_callback(self._request_done)
+        return future
+
+    def _request_done(self, future):
+        with self._lock:
+            self.active_requests -= 1
+
+    def generate(self, prompt_text, streamer=None, max_new_tokens=None):
+        return self.submit(prompt_text, streamer, max_new_tokens).result()
+
+    def _generate(self, prompt_text, streamer, max_new_tokens):
+        pieces = []
+        try:
+            for chunk in self.llm(prompt_text, max_tokens=max_new_tokens, temperature=self.temperature,
+                                  top_k=self.top_k, top_p=self.top_p, stream=True):
+                piece = chunk["choices"][0]["text"]
+                pieces.append(piece)
+                self.generated_tokens += 1
+                if streamer is not None and piece:
+                    streamer.on_finalized_text(piece)
+        finally:
+            if streamer is not None:
+                streamer.on_finalized_text("", stream_end=True)
+        return "".join(pieces)
+
+def resolve_precision(precision=LLM_PRECISION):
+    """Maps "auto" to fp16 on GPU and fp32 on CPU."""
+    if precision == "auto":
+        return "fp16" if torch.cuda.is_available() else "fp32"
+    return precision
+
+def model_bytes(model):
+    """Bytes of a model's weights and buffers, including packed int8 Linear weights."""
+    def tensor_bytes(value):
+        if isinstance(value, torch.Tensor):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(item) for item in value)
+        return 0
+    return sum(tensor_bytes(value) for value in model.state_dict().values())
+
+def load_local_llm(model_name=LLM_MODEL_NAME, precision=LLM_PRECISION, gguf_path=LLM_GGUF_PATH):
+    """
+    Loads the tokenizer and text generator for the selected precision:
+      fp16 - half precision on GPU (what "auto" picks when CUDA is available)
+      fp32 - full precision on CPU (what "auto" picks otherwise; about 28 GB for Mistral-7B)
+      bf16 - bfloat16 weights on CPU (half the memory of fp32)
+      int8 - fp32 load followed by in-place dynamic int8 quantization of every Linear layer
+      gguf - a quantized GGUF file (LLM_GGUF_PATH) run by llama.cpp
+    The Hugging Face tokenizer is loaded in every mode, since prompts use its chat template.
+    """
+    precision = resolve_precision(precision)
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown LLM precision '{precision}'. Expected one of {PRECISIONS}.")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if precision == "gguf":
+        return tokenizer, LlamaCppGenerator(gguf_path)
+
+    dtype = {"fp16": torch.float16, "bf16": torch.bfloat16}.get(precision, torch.float32)
+    model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=dtype, low_cpu_mem_usage=True)
+    if precision == "fp16":
+        model.to("cuda:0")
+    elif precision == "int8":
+        # In place: a copy would hold the fp32 and int8 weights at once, doubling peak memory.
+        model.eval()
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    model.eval()
+
+    # Every request thread submits to one generation worker that batches concurrent prompts.
+    return tokenizer, ContinuousBatchingGenerator(model, tokenizer)
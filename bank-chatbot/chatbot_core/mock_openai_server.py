@@ -0,0 +1,101 @@
+"""
+Local mock of the OpenAI chat completions API, for exercising the client's timeouts,
+retries, concurrency cap and circuit breaker without calling the real API.
+
+Serves POST /v1/chat/completions (plain and streamed). Failures and latency are
+configurable, and GET /stats reports how many requests it received and failed.
+
+Usage:
+    python -m chatbot_core.mock_openai_server --port 8081 --latency 0.2 --error-rate 0.3 --error-status 503
+    OPENAI_BASE_URL=http://127.0.0.1:8081/v1 LLM_PROVIDERS=openai python app.py
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ANSWER = "Según el manual, tienes 14 días de vacaciones al año, que aumentan a 18 después de cinco años."
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    latency = 0.0
+    error_rate = 0.0
+    error_status = 503
+    retry_after = None
+    stats = {"requests": 0, "errors": 0}
+    stats_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet under load
+
+    def do_GET(self):
+        if self.path != "/stats":
+            return self._send_json(404, {"error": {"message": "Not found"}})
+        with self.stats_lock:
+            self._send_json(200, dict(self.stats))
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path != "/v1/chat/completions":
+            return self._send_json(404, {"error": {"message": "Not found"}})
+        fail = random.random() < self.error_rate
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            self.stats["errors"] += fail
+        time.sleep(self.latency)
+        if fail:
+            headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else {}
+            return self._send_json(self.error_status, {"error": {"message": "Mock failure"}}, headers)
+        if body.get("stream"):
+            return self._send_stream(body.get("model"))
+        self._send_json(200, {
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}]
+        })
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for word in ANSWER.split(" "):
+            chunk = {"object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": word + " "}}]}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+def create_mock_server(port=8081, latency=0.0, error_rate=0.0, error_status=503, retry_after=None):
+    """Creates (without starting) a mock server on 127.0.0.1; call serve_forever() on it."""
+    handler = type("ConfiguredMockOpenAIHandler", (MockOpenAIHandler,), {
+        "latency": latency, "error_rate": error_rate, "error_status": error_status, "retry_after": retry_after,
+        "stats": {"requests": 0, "errors": 0}, "stats_lock": threading.Lock()
+    })
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat completions server.")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before every response.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail.")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, help="Retry-After header sent with failures.")
+    args = parser.parse_args()
+
+    server = create_mock_server(args.port, args.latency, args.error_rate, args.error_status, args.retry_after)
+    print(f"Mock OpenAI API on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
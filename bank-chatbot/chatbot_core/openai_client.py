@@ -0,0 +1,300 @@
+"""
+Asynchronous client for OpenAI-compatible chat completion APIs.
+
+Calls run on one asyncio event loop in a background thread, so Flask workers only
+block on their own call's result, never on the HTTP I/O of other calls. All calls
+share one HTTP connection pool. Each call has a deadline that covers queueing and
+retries. 429, 5xx and connection errors are retried with exponential backoff.
+A semaphore caps the calls in flight, and a circuit breaker fails fast while the
+upstream keeps failing.
+
+Try it against the mock server:
+    python -m chatbot_core.mock_openai_server --port 8081 --error-rate 0.3 &
+    python -m chatbot_core.openai_client --base-url http://127.0.0.1:8081/v1 --requests 200
+"""
+import json
+import time
+import queue
+import random
+import asyncio
+import threading
+import httpx
+from .config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL_NAME, OPENAI_TIMEOUT_SECONDS, OPENAI_MAX_RETRIES,
+    OPENAI_BACKOFF_BASE_SECONDS, OPENAI_BACKOFF_MAX_SECONDS, OPENAI_MAX_CONCURRENCY,
+    OPENAI_CIRCUIT_FAILURE_THRESHOLD, OPENAI_CIRCUIT_RESET_SECONDS
+)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class UpstreamError(Exception):
+    """The API answered with an error status."""
+
+    def __init__(self, status_code, message):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+
+def is_upstream_failure(exc):
+    """True for errors that say the API is unhealthy: transport errors, timeouts, 429 and 5xx."""
+    if isinstance(exc, UpstreamError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return isinstance(exc, (TimeoutError, httpx.TransportError))
+
+class ConcurrencyLimitError(Exception):
+    """No call slot became free before the deadline."""
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open after repeated failures, so the call was not attempted."""
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls. While open, calls fail
+    fast. After `reset_seconds` one trial call is let through (half-open): its success
+    closes the circuit and its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=OPENAI_CIRCUIT_FAILURE_THRESHOLD, reset_seconds=OPENAI_CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True when a call may be attempted now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+
+    def release_trial(self):
+        """Gives the trial call back when it was abandoned, so the next call becomes the trial."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+class AsyncOpenAIClient:
+    """
+    Chat completions client. chat() and stream_chat() are blocking wrappers for Flask
+    workers; the HTTP calls themselves run on the client's event loop thread.
+    """
+
+    def __init__(self, api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, model=OPENAI_MODEL_NAME,
+                 timeout=OPENAI_TIMEOUT_SECONDS, max_retries=OPENAI_MAX_RETRIES,
+                 backoff_base=OPENAI_BACKOFF_BASE_SECONDS, backoff_max=OPENAI_BACKOFF_MAX_SECONDS,
+                 max_concurrency=OPENAI_MAX_CONCURRENCY, breaker=None):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = 0
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="openai-client", daemon=True).start()
+        # The semaphore and HTTP client belong to the loop, so create them on it.
+        self._semaphore, self._http = asyncio.run_coroutine_threadsafe(
+            self._setup(api_key, base_url, max_concurrency), self._loop).result()
+
+    async def _setup(self, api_key, base_url, max_concurrency):
+        http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=self.timeout
+        )
+        return asyncio.Semaphore(max_concurrency), http
+
+    # --- Blocking interface ---
+
+    def chat(self, messages, **params):
+        """Returns the completion text. Raises TimeoutError once the deadline passes."""
+        future = asyncio.run_coroutine_threadsafe(self.achat(messages, **params), self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stream_chat(self, messages, **params):
+        """Yields the completion text as it arrives."""
+        pieces = queue.Queue()
+        done = object()
+
+        async def produce():
+            try:
+                async for piece in self.astream_chat(messages, **params):
+                    pieces.put(piece)
+                pieces.put(done)
+            except BaseException as e:
+                pieces.put(e)
+                raise
+
+        future = asyncio.run_coroutine_threadsafe(produce(), self._loop)
+        try:
+            while True:
+                item = pieces.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            future.cancel()  # Stops reading the upstream stream when the consumer goes away
+
+    def stats(self):
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "retries": self.retries
+        }
+
+    # --- Async interface ---
+
+    async def achat(self, messages, **params):
+        payload = {"model": self.model, "messages": messages, **params}
+        deadline = self._loop.time() + self.timeout
+        async with _CallSlot(self, deadline):
+            response = await self._post(payload, deadline)
+            data = response.json()
+        return data["choices"][0]["message"]["content"]
+
+    async def astream_chat(self, messages, **params):
+        payload = {"model": self.model, "messages": messages, "stream": True, **params}
+        deadline = self._loop.time() + self.timeout
+        async with _CallSlot(self, deadline):
+            # Retries only happen before the first byte; the deadline then covers each read.
+            response = await self._post(payload, deadline, stream=True)
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices")
+                    piece = choices[0].get("delta", {}).get("content") if choices else None
+                    if piece:
+                        yield piece
+            finally:
+                await response.aclose()
+
+    async def _post(self, payload, deadline, stream=False):
+        """POSTs to /chat/completions, retrying retryable failures with exponential backoff and jitter."""
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"OpenAI call exceeded its {self.timeout}s deadline")
+            retry_after = None
+            try:
+                request = self._http.build_request("POST", "/chat/completions", json=payload, timeout=remaining)
+                response = await self._http.send(request, stream=stream)
+                if response.status_code < 400:
+                    return response
+                body = (await response.aread()).decode("utf-8", "replace")[:200]
+                await response.aclose()
+                error = UpstreamError(response.status_code, body)
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise error
+                retry_after = response.headers.get("retry-after")
+            except httpx.TimeoutException:
+                error = TimeoutError(f"OpenAI call exceeded its {self.timeout}s deadline")
+            except httpx.TransportError as e:
+                error = e
+
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+            if retry_after and retry_after.replace(".", "", 1).isdigit():
+                delay = max(delay, float(retry_after))
+            if attempt == self.max_retries or self._loop.time() + delay >= deadline:
+                raise error
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+class _CallSlot:
+    """Holds a concurrency slot for one call and reports its outcome to the circuit breaker."""
+
+    def __init__(self, client, deadline):
+        self.client = client
+        self.deadline = deadline
+
+    async def __aenter__(self):
+        client = self.client
+        try:
+            await asyncio.wait_for(client._semaphore.acquire(), max(0.0, self.deadline - client._loop.time()))
+        except asyncio.TimeoutError:
+            raise ConcurrencyLimitError(f"No free OpenAI call slot within {client.timeout}s")
+        if not client.breaker.allow():
+            client._semaphore.release()
+            raise CircuitOpenError("OpenAI circuit breaker is open")
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.client._semaphore.release()
+        if exc_type is None:
+            self.client.breaker.record_success()
+        elif is_upstream_failure(exc):
+            self.client.breaker.record_failure()
+        elif isinstance(exc, UpstreamError):
+            # A 4xx such as 400 or 401 is our request's fault; the API itself answered.
+            self.client.breaker.record_success()
+        else:
+            # The caller went away (or our own code failed); this says nothing about the upstream.
+            self.client.breaker.release_trial()
+        return False
+
+if __name__ == "__main__":
+    import argparse
+    from collections import Counter
+    from concurrent.futures import ThreadPoolExecutor
+
+    parser = argparse.ArgumentParser(description="Fires concurrent chat calls and reports outcomes, latency and the circuit state.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8081/v1")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent callers (Flask worker threads).")
+    parser.add_argument("--timeout", type=float, default=OPENAI_TIMEOUT_SECONDS)
+    parser.add_argument("--stream", action="store_true")
+    args = parser.parse_args()
+
+    client = AsyncOpenAIClient(api_key="test", base_url=args.base_url, timeout=args.timeout)
+    outcomes = Counter()
+    latencies = []
+
+    def call(i):
+        start = time.perf_counter()
+        messages = [{"role": "user", "content": f"Pregunta {i}"}]
+        try:
+            if args.stream:
+                "".join(client.stream_chat(messages))
+            else:
+                client.chat(messages)
+            outcomes["ok"] += 1
+        except Exception as e:
+            outcomes[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(call, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"requests={args.requests} time={elapsed:.2f}s outcomes={dict(outcomes)}")
+    print(f"p50={latencies[len(latencies) // 2] * 1000:.0f}ms p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.0f}ms {client.stats()}")
@@ -0,0 +1,273 @@
+import queue
+from contextlib import contextmanager
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from .config import (
+    COMPANY_NAME, LLM_PROVIDERS, LLM_MODEL_NAME, LLM_PRECISION, LLM_LOCAL_TIMEOUT_SECONDS, LLM_LOCAL_MAX_QUEUE
+)
+from .startup import start_background, is_ready
+
+UNAVAILABLE_ANSWER = "Lo siento, el modelo de lenguaje para generar respuestas no está disponible en este momento. Por favor, contacte a soporte."
+
+class ProviderUnavailable(Exception):
+    """The provider cannot take this request (still loading, overloaded or failed to load)."""
+
+class CircuitOpen(ProviderUnavailable):
+    """The provider failed repeatedly and is not being called for a while."""
+
+class LLMProvider:
+    """
+    Generates answers to manual questions. Subclasses implement build_prompt(),
+    generate() and stream(), and raise ProviderUnavailable or TimeoutError so the
+    ProviderRouter can hand the request to the next provider.
+    """
+
+    name = None
+    category_prefix = None
+    referral_answer = "Lo siento, no tengo suficiente información para responder a esa pregunta. Si necesitas más ayuda, puedo agendar una llamada con un representante."
+    error_answer = "Lo siento, no pude obtener una respuesta en este momento. Por favor, intenta de nuevo o agenda una llamada con un representante."
+    referral_phrases = ("no puedo responder", "no tengo información")
+    min_answer_length = 0
+
+    def start(self):
+        """Starts loading heavy resources (in the background)."""
+
+    def is_ready(self):
+        """True once loading finished, even if it failed."""
+        return True
+
+    def generate(self, q, context):
+        """Returns the generated answer text."""
+        raise NotImplementedError
+
+    def stream(self, q, context):
+        """Yields the answer text as it is generated."""
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+    def finalize(self, generated_text):
+        """Strips a "response:" prefix and turns weak answers into a referral. Returns (answer, category)."""
+        response_text = generated_text.strip()
+        if response_text.lower().startswith("response:"):
+            response_text = response_text[len("response:"):].strip()
+
+        if len(response_text) < self.min_answer_length or any(phrase in response_text.lower() for phrase in self.referral_phrases):
+            return self.referral_answer, f"{self.category_prefix} - Referral"
+        return response_text, f"{self.category_prefix} - General"
+
+class LocalLLMProvider(LLMProvider):
+    """Local Hugging Face (or GGUF) model served by the continuous-batching generation server."""
+
+    name = "local"
+    category_prefix = "LLM Local"
+    referral_answer = "Lo siento, no tengo suficiente información para responder a esa pregunta basada en el manual. Si necesitas más ayuda, puedo agendar una llamada con un representante de Recursos Humanos."
+    error_answer = "Disculpa, no pude obtener una respuesta en este momento con el modelo local. Por favor, intenta de nuevo o agenda una llamada con un representante."
+    referral_phrases = ("no puedo responder", "no tengo información", "disculpa")
+    min_answer_length = 30
+
+    def __init__(self, model_name=LLM_MODEL_NAME, precision=LLM_PRECISION,
+                 timeout=LLM_LOCAL_TIMEOUT_SECONDS, max_queue=LLM_LOCAL_MAX_QUEUE):
+        self.model_name = model_name
+        self.precision = precision
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self.tokenizer = None
+        self.generator = None
+
+    def start(self):
+        start_background("llm", self._load)
+
+    def _load(self, component):
+        from .llm_loader import load_local_llm, resolve_precision
+
+        try:
+            print(f"Cargando el tokenizador y modelo LLM: {self.model_name} ({resolve_precision(self.precision)})...")
+            with component.timed_phase("load_model"):
+                self.tokenizer, self.generator = load_local_llm(self.model_name, self.precision)
+            print(f"Modelo LLM '{self.model_name}' cargado para generación de texto.")
+        except Exception as e:
+            print(f"ERROR: No se pudo cargar el modelo LLM '{self.model_name}'. Detalles: {e}")
+            self.generator = None
+            component.mark_degraded(e)
+
+    def is_ready(self):
+        return is_ready("llm")
+
+    def stats(self):
+        return {"active_requests": self.generator.active_requests if self.generator else 0}
+
+    def build_prompt(self, q, context):
+        messages = [
+            {"role": "system", "content": f"Eres un asistente virtual útil para los empleados de {COMPANY_NAME}, respondiendo preguntas estrictamente basadas en la información proporcionada del manual. Si la información no está en el manual, sugiere agendar una llamada."},
+            {"role": "user", "content": f"Basado en la siguiente información del manual:\n\nContexto del Manual:\n{context}\n\nPregunta del Empleado: {q}\n\nRespuesta clara y concisa:"}
+        ]
+        return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+
+    def _check_available(self):
+        if self.generator is None:
+            raise ProviderUnavailable("still loading" if not self.is_ready() else "the model failed to load")
+        if self.generator.active_requests >= self.max_queue:
+            raise ProviderUnavailable(f"overloaded ({self.generator.active_requests} requests in flight)")
+
+    def generate(self, q, context):
+        self._check_available()
+        future = self.generator.submit(self.build_prompt(q, context))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()  # Frees the batch slot at the next decoding step
+            raise TimeoutError(f"no answer within {self.timeout}s")
+
+    def stream(self, q, context):
+        from transformers import TextIteratorStreamer
+
+        self._check_available()
+        # The generation server only feeds generated tokens to the streamer, never the prompt.
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=False, skip_special_tokens=True, timeout=self.timeout)
+        future = self.generator.submit(self.build_prompt(q, context), streamer=streamer)
+        try:
+            for piece in streamer:
+                yield piece
+            future.result()  # Surfaces generation errors
+        except queue.Empty:
+            raise TimeoutError(f"no token within {self.timeout}s")
+        finally:
+            if not future.done():
+                future.cancel()
+
+class OpenAIProvider(LLMProvider):
+    """
+    Chat completions over HTTP from OpenAI or any OpenAI-compatible server (OPENAI_BASE_URL),
+    through the shared asynchronous client (deadlines, retries, concurrency cap, circuit breaker).
+    """
+
+    name = "openai"
+    category_prefix = "OpenAI"
+
+    def __init__(self, client=None):
+        from .openai_client import AsyncOpenAIClient
+
+        self.client = client or AsyncOpenAIClient()
+
+    def stats(self):
+        return self.client.stats()
+
+    def build_prompt(self, q, context):
+        return f"Basado en la siguiente información del manual de empleados de {COMPANY_NAME}:\n\n{context}\n\nPregunta: {q}\n\nRespuesta:"
+
+    def generate(self, q, context):
+        with self._client_errors():
+            return self.client.chat([{"role": "user", "content": self.build_prompt(q, context)}], temperature=0.7)
+
+    def stream(self, q, context):
+        with self._client_errors():
+            yield from self.client.stream_chat([{"role": "user", "content": self.build_prompt(q, context)}], temperature=0.7)
+
+    @contextmanager
+    def _client_errors(self):
+        """Maps the client's fail-fast errors to provider unavailability, so the router can fall back."""
+        from .openai_client import CircuitOpenError, ConcurrencyLimitError
+
+        try:
+            yield
+        except CircuitOpenError as e:
+            raise CircuitOpen(str(e))
+        except ConcurrencyLimitError as e:
+            raise ProviderUnavailable(f"overloaded ({e})")
+
+class StubProvider(LLMProvider):
+    """Deterministic provider for tests and load tests: echoes the start of the retrieved context."""
+
+    name = "stub"
+    category_prefix = "Stub"
+
+    def generate(self, q, context):
+        return f"Según el manual: {context.strip()[:200]}"
+
+    def stream(self, q, context):
+        for word in self.generate(q, context).split(" "):
+            yield word + " "
+
+PROVIDER_CLASSES = {
+    "local": LocalLLMProvider,
+    "openai": OpenAIProvider,
+    "stub": StubProvider
+}
+
+class ProviderRouter:
+    """
+    Tries the providers in order for every request. A provider that is unavailable
+    (loading, overloaded), times out or fails hands the request to the next one.
+    """
+
+    def __init__(self, providers):
+        self.providers = providers
+
+    def start(self):
+        for provider in self.providers:
+            provider.start()
+
+    def is_ready(self):
+        return any(provider.is_ready() for provider in self.providers)
+
+    def stats(self):
+        return {provider.name: provider.stats() for provider in self.providers}
+
+    def generate_answer(self, q, context):
+        """Generates the whole answer with the first provider that succeeds. Returns (answer, category)."""
+        failures = []
+        for provider in self.providers:
+            try:
+                return provider.finalize(provider.generate(q, context))
+            except Exception as e:
+                failures.append(self._failure(provider, e))
+        return self._final_failure(failures)
+
+    def stream_answer(self, q, context, result):
+        """
+        Yields the answer text as the first working provider generates it. Once exhausted,
+        result["answer"] and result["category"] hold the post-processed answer.
+        A provider only falls back before it streamed any text.
+        """
+        failures = []
+        for provider in self.providers:
+            pieces = []
+            try:
+                for piece in provider.stream(q, context):
+                    pieces.append(piece)
+                    yield piece
+                result["answer"], result["category"] = provider.finalize("".join(pieces))
+                return
+            except Exception as e:
+                failures.append(self._failure(provider, e))
+                if pieces:
+                    break
+        result["answer"], result["category"] = self._final_failure(failures)
+
+    @staticmethod
+    def _failure(provider, error):
+        if isinstance(error, CircuitOpen):
+            # Fail fast with the referral instead of an error while the provider recovers.
+            print(f"LLM provider '{provider.name}' circuit open: {error}")
+            return False, provider.referral_answer, f"{provider.category_prefix} - Circuit Open"
+        if isinstance(error, ProviderUnavailable):
+            print(f"LLM provider '{provider.name}' unavailable: {error}")
+            return False, UNAVAILABLE_ANSWER, f"{provider.category_prefix} - Unavailable"
+        print(f"Error generating the answer with the '{provider.name}' LLM provider: {error}")
+        return True, provider.error_answer, f"{provider.category_prefix} - Error"
+
+    @staticmethod
+    def _final_failure(failures):
+        """Reports the last error, or the first provider's unavailability when none failed outright."""
+        errors = [failure for failure in failures if failure[0]]
+        _, answer, category = errors[-1] if errors else failures[0]
+        return answer, category
+
+def create_provider_router(names=LLM_PROVIDERS):
+    """Creates the providers listed in config.py (LLM_PROVIDERS), in fallback order."""
+    names = [name.strip() for name in names if name.strip()]
+    unknown = [name for name in names if name not in PROVIDER_CLASSES]
+    if unknown or not names:
+        raise ValueError(f"Unknown LLM providers {unknown}. Expected some of {tuple(PROVIDER_CLASSES)}.")
+    return ProviderRouter([PROVIDER_CLASSES[name]() for name in names])
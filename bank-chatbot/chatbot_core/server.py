@@ -0,0 +1,206 @@
+"""
+Flask app shared by every backend. The LLM providers come from config.py (LLM_PROVIDERS).
+"""
+from flask import Flask, request, jsonify, Response, stream_with_context
+import re
+from datetime import datetime
+from .config import BOT_NAME, INTENT_EMBEDDING_CLASSIFIER
+from .database import verify_employee_identity, get_employee_data
+from . import data_processor
+from .data_processor import retrieve, reindex, on_reindex
+from .answer_cache import SemanticAnswerCache
+from .intent_router import IntentRouter
+from .providers import create_provider_router
+from .utils import user_sessions, log_request, format_sse
+from .startup import start_background, is_ready, health_report, LOADING
+
+app = Flask(__name__)
+
+# Answers that can be served again to similar questions with the same context
+answer_cache = SemanticAnswerCache()
+on_reindex(lambda stats: answer_cache.clear())
+
+def is_cacheable(category):
+    return category.endswith((" - General", " - Referral"))
+
+def encode_intent_texts(texts):
+    """Embeds texts for the intent classifier with the retrieval model, or returns None while it loads."""
+    if data_processor.model is None:
+        return None
+    return data_processor.model.encode(texts, normalize_embeddings=True)
+
+intent_router = IntentRouter(encode=encode_intent_texts if INTENT_EMBEDDING_CLASSIFIER else None)
+
+# The manual index and the LLM providers load in the background; intent answers are served meanwhile.
+provider_router = create_provider_router()
+start_background("index", data_processor.initialize_data)
+provider_router.start()
+
+STARTING_ANSWER = "El asistente todavía se está iniciando y aún no puede responder preguntas sobre el manual. Por favor, intenta de nuevo en unos minutos."
+
+def wants_stream(data):
+    """Streaming is opt-in, via {"stream": true} in the body or ?stream=1."""
+    return bool(data.get("stream")) or request.args.get("stream") in ("1", "true")
+
+def answer_response(response_text, stream):
+    """Returns the answer as JSON, or as a single Server-Sent Event in streaming mode."""
+    if stream:
+        return Response(format_sse({"answer": response_text, "done": True}), mimetype="text/event-stream")
+    return jsonify({"answer": response_text})
+
+# --- Flask Routes ---
+@app.route("/ask", methods=["POST"])
+def ask():
+    data = request.json
+    q = data.get("question", "")
+    sender_id = data.get("sender", "unknown_sender")
+    stream = wants_stream(data)
+
+    if not q:
+        return jsonify({"answer": "Please ask a question."}), 400
+
+    session = user_sessions.get(sender_id, {})
+    employee_id = session.get('employee_id')
+    is_verified = session.get('verified', False)
+    
+    lower_q = q.lower().strip()
+    response_text = ""
+    category = "General"
+
+    # --- Identity Verification Flow ---
+    if not is_verified:
+        if ("id number" in lower_q or "employee id" in lower_q) and ("employee code" in lower_q):
+            id_match = re.search(r"(?:my id number is|id number|mi número de identificación es|mi id es)\s*(\S+)", lower_q)
+            code_match = re.search(r"(?:my employee code is|employee code|mi código de empleado es|mi código es)\s*(\d+)", lower_q)
+
+            if id_match and code_match:
+                id_number = id_match.group(1).strip()
+                employee_code = code_match.group(1).strip()
+                
+                verified_id = verify_employee_identity(id_number, employee_code)
+                if verified_id:
+                    user_sessions[sender_id] = {'employee_id': verified_id, 'verified': True}
+                    response_text = f"¡Bienvenido! Su identidad ha sido verificada. ¿En qué puedo asistirte hoy?"
+                    category = "Identity Verification Success"
+                else:
+                    response_text = "Lo siento, no pude verificar su identidad. Por favor, asegúrese de que su número de identificación y su código de empleado sean correctos y vuelva a intentarlo."
+                    category = "Identity Verification Failed"
+            else:
+                response_text = f"Para poder ayudarle, por favor, comparta su número de identificación completo y su código de empleado. Por ejemplo: 'Mi número de identificación es XXXXXXXXXX y mi código de empleado es 12345'."
+                category = "Identity Verification Prompt"
+        else:
+            response_text = f"Hola, soy tu asistente virtual, {BOT_NAME}. Para poder asistirte, primero necesito verificar tu identidad. Por favor, comparte tu número de identificación y tu código de empleado."
+            category = "Welcome/Identity Prompt"
+        
+        log_request(sender_id, q, response_text, category, employee_id)
+        return answer_response(response_text, stream)
+
+    # --- If identity is verified, proceed with other requests ---
+    intent = intent_router.route(q)
+    if intent == "greeting":
+        response_text = f"Hola, soy tu asistente virtual, {BOT_NAME}. ¿En qué puedo ayudarte hoy?"
+        category = "Welcome"
+    elif intent == "work_letter":
+        response_text = "Para solicitar tu carta de trabajo, puedes hacerlo directamente desde el portal de empleados (enlace al portal) siguiendo estos pasos: 1. Inicia sesión con tu usuario y contraseña. 2. Selecciona la opción 'Solicitudes Internas'. 3. Elige 'Carta de Trabajo' y completa la información solicitada."
+        category = "Work Letter"
+    elif intent in ("vacation", "vacation_pay"):
+        if intent == "vacation_pay":
+            response_text = "El pago de vacaciones se procesa anualmente basado en tu fecha de contratación. Puedes verificar tus pagos en el portal de empleados > Mis Pagos. Si no aparece, por favor, responde con 'RECLAMO PAGO DE VACACIONES'."
+            category = "Vacation - Pay"
+        else:
+            employee_data = get_employee_data(employee_id)
+            hire_date_info = ""
+            if employee_data and employee_data.get('hire_date'):
+                try:
+                    fecha_obj = datetime.strptime(employee_data['hire_date'], "%Y-%m-%d")
+                    hire_date_info = f" el {fecha_obj.strftime('%d de %B de %Y')}"
+                except ValueError:
+                    hire_date_info = f" el {employee_data['hire_date']}"
+            
+            response_text = f"Tienes derecho a vacaciones{hire_date_info}. Tienes 14 días para disfrutar cada año. Después de 5 años, aumenta a 18 días pagados + 14 días de disfrute. Para solicitar tus vacaciones, puedes hacerlo directamente desde el portal de empleados (enlace al portal) seleccionando 'Solicitud de Vacaciones'."
+            category = "Vacation"
+    elif intent == "loan":
+        response_text = "Para solicitar un préstamo personal, debes ser empleado permanente y tener al menos 6 meses en la institución. Puedes iniciar la solicitud en el portal de empleados > 'Solicitudes Financieras'."
+        category = "Loan"
+    elif intent == "bonus":
+        response_text = "El bono de rendimiento se calcula anualmente en base a los objetivos del banco y tu desempeño individual. Se distribuye en el segundo trimestre de cada año fiscal."
+        category = "Bonus"
+    elif not (is_ready("index") and provider_router.is_ready()):
+        # The manual is still loading; intent answers above keep working meanwhile.
+        response_text = STARTING_ANSWER
+        category = "Startup - Not Ready"
+    else:
+        # Fallback to the LLM providers if no specific intent is found
+        retrieval = retrieve(q)
+        context = retrieval.context
+        cached_answer = answer_cache.get(retrieval.embedding, retrieval.chunk_ids)
+
+        if cached_answer:
+            response_text, category = cached_answer
+        elif stream:
+            return Response(stream_with_context(stream_events(q, retrieval, sender_id, employee_id)), mimetype="text/event-stream")
+        else:
+            response_text, category = provider_router.generate_answer(q, context)
+
+        if not cached_answer and is_cacheable(category):
+            answer_cache.put(retrieval.embedding, retrieval.chunk_ids, (response_text, category))
+        
+    log_request(sender_id, q, response_text, category, employee_id)
+    return answer_response(response_text, stream)
+
+def stream_events(q, retrieval, sender_id, employee_id):
+    """Streams the LLM fallback as Server-Sent Events: token events, then the final answer."""
+    result = {}
+    for piece in provider_router.stream_answer(q, retrieval.context, result):
+        yield format_sse({"token": piece})
+    response_text, category = result["answer"], result["category"]
+    if is_cacheable(category):
+        answer_cache.put(retrieval.embedding, retrieval.chunk_ids, (response_text, category))
+    log_request(sender_id, q, response_text, category, employee_id)
+    yield format_sse({"answer": response_text, "done": True})
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the process is up. Reports the loading state and phase timings of every component."""
+    return jsonify(health_report())
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: 503 until every component finished loading (a degraded component still serves)."""
+    report = health_report()
+    return jsonify(report), 503 if report["status"] == LOADING else 200
+
+@app.route("/admin/reindex", methods=["POST"])
+def admin_reindex():
+    """
+    Re-indexes the manual incrementally and reports how many chunks were added, removed and reused.
+    The other workers load the new generation within INDEX_REFRESH_SECONDS (on their next request).
+    """
+    if not is_ready("index"):
+        return jsonify({"error": "The manual index is still loading."}), 503
+    try:
+        stats = reindex()
+    except Exception as e:
+        print(f"Error re-indexing the manual: {e}")
+        return jsonify({"error": str(e)}), 500
+    return jsonify(stats)
+
+@app.route("/admin/llm-providers", methods=["GET"])
+def admin_llm_providers():
+    """Reports the load of every LLM provider and the state of the OpenAI circuit breaker."""
+    return jsonify(provider_router.stats())
+
+@app.route("/admin/answer-cache", methods=["GET"])
+def admin_answer_cache():
+    """Reports the semantic answer cache hit/miss counters."""
+    return jsonify(answer_cache.stats())
+
+@app.route("/admin/retrieval-stats", methods=["GET"])
+def admin_retrieval_stats():
+    """Reports per-stage retrieval latencies (batch wait, embed, vector/BM25 search, fusion, rerank)."""
+    reranker = data_processor.reranker
+    return jsonify({
+        "mode": "hybrid" if data_processor.keyword_index is not None else "vector",
+        "stages": data_processor.stage_timer.report(),
+        "reranker": reranker.stats() if reranker else None
+    })
@@ -0,0 +1,152 @@
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from .config import SESSION_STORE, SESSION_TTL_SECONDS, SESSION_MAX_ENTRIES, SESSION_DB_FILE
+
+class SessionStore:
+    """
+    Expiring store of per-sender session dicts.
+
+    Supports the small dict interface app.py uses (get, [] assignment, del, in).
+    Expiry is sliding: every read or write pushes a session's expiry out by ttl_seconds.
+    """
+
+    def get(self, sender_id, default=None):
+        raise NotImplementedError
+
+    def __setitem__(self, sender_id, session):
+        raise NotImplementedError
+
+    def __delitem__(self, sender_id):
+        raise NotImplementedError
+
+    def __contains__(self, sender_id):
+        return self.get(sender_id) is not None
+
+    def __len__(self):
+        raise NotImplementedError
+
+class InMemorySessionStore(SessionStore):
+    """Per-process LRU + TTL session store, capped at max_entries sessions."""
+
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS, max_entries=SESSION_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._sessions = OrderedDict()  # sender_id -> (expires_at, session)
+        self._lock = threading.Lock()
+
+    def get(self, sender_id, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(sender_id)
+            if entry is None:
+                return default
+            if entry[0] <= now:
+                del self._sessions[sender_id]
+                return default
+            self._sessions[sender_id] = (now + self.ttl_seconds, entry[1])
+            self._sessions.move_to_end(sender_id)
+            return dict(entry[1])
+
+    def __setitem__(self, sender_id, session):
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[sender_id] = (now + self.ttl_seconds, dict(session))
+            self._sessions.move_to_end(sender_id)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+
+    def __delitem__(self, sender_id):
+        with self._lock:
+            self._sessions.pop(sender_id, None)
+
+    def __len__(self):
+        now = time.monotonic()
+        with self._lock:
+            for sender_id in [s for s, (expires_at, _) in self._sessions.items() if expires_at <= now]:
+                del self._sessions[sender_id]
+            return len(self._sessions)
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store shared by every worker process through a local SQLite (WAL) file,
+    so a sender can be served by any worker without re-verifying.
+    Expired sessions are purged periodically and at most max_entries are kept.
+    """
+
+    PURGE_INTERVAL_SECONDS = 60
+
+    def __init__(self, path=SESSION_DB_FILE, ttl_seconds=SESSION_TTL_SECONDS, max_entries=SESSION_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._last_purge = 0.0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "sender_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, sender_id, default=None):
+        # Wall-clock time, since expiry is shared across processes.
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT data, expires_at FROM sessions WHERE sender_id = ? AND expires_at > ?",
+                (sender_id, now)).fetchone()
+            if row is None:
+                return default
+            # Only refresh the expiry once half of the TTL has elapsed, to keep reads cheap.
+            if row[1] - now < self.ttl_seconds / 2:
+                conn.execute("UPDATE sessions SET expires_at = ? WHERE sender_id = ?",
+                             (now + self.ttl_seconds, sender_id))
+        return json.loads(row[0])
+
+    def __setitem__(self, sender_id, session):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO sessions (sender_id, data, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(sender_id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+                (sender_id, json.dumps(session), now + self.ttl_seconds))
+        self._maybe_purge(now)
+
+    def __delitem__(self, sender_id):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE sender_id = ?", (sender_id,))
+
+    def __len__(self):
+        row = self._connection().execute("SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)).fetchone()
+        return row[0]
+
+    def _maybe_purge(self, now):
+        if now - self._last_purge < self.PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            # Sessions closest to expiry are the least recently used ones.
+            conn.execute(
+                "DELETE FROM sessions WHERE sender_id IN ("
+                "SELECT sender_id FROM sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,))
+
+def create_session_store(kind=SESSION_STORE):
+    """Creates the session store selected in config.py ("memory" or "sqlite")."""
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    if kind == "memory":
+        return InMemorySessionStore()
+    raise ValueError(f"Unknown session store '{kind}'. Expected 'memory' or 'sqlite'.")
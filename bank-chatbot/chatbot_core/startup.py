@@ -0,0 +1,103 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Component states
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+DEGRADED = "degraded"  # Finished, but with a fallback or an error; the app keeps serving
+
+PROCESS_STARTED_AT = time.monotonic()
+
+class Component:
+    """Tracks the loading state and per-phase timings of one heavy startup component."""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = PENDING
+        self.phase = None
+        self.phases = {}  # phase name -> seconds
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timed_phase(self, phase):
+        """Times one loading phase (e.g. reading the PDF, loading a model)."""
+        with self._lock:
+            self.phase = phase
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[phase] = round(time.monotonic() - start, 3)
+                self.phase = None
+
+    def mark_degraded(self, error):
+        """Flags that loading finished with a fallback instead of the real resource."""
+        with self._lock:
+            self.error = str(error)
+
+    def report(self):
+        with self._lock:
+            elapsed_until = self.finished_at or time.monotonic()
+            return {
+                "state": self.state,
+                "current_phase": self.phase,
+                "phases": dict(self.phases),
+                "elapsed_s": round(elapsed_until - self.started_at, 3) if self.started_at else 0.0,
+                "error": self.error
+            }
+
+components = {}
+
+def get_component(name):
+    if name not in components:
+        components[name] = Component(name)
+    return components[name]
+
+def start_background(name, loader):
+    """
+    Runs loader(component) on a daemon thread. The component becomes ready when the
+    loader returns, or degraded when it raises or calls component.mark_degraded().
+    """
+    component = get_component(name)
+
+    def run():
+        component.state = LOADING
+        component.started_at = time.monotonic()
+        try:
+            loader(component)
+        except Exception as e:
+            print(f"Error loading '{name}': {e}")
+            component.mark_degraded(e)
+        component.finished_at = time.monotonic()
+        component.state = DEGRADED if component.error else READY
+        print(f"Startup: '{name}' {component.state} in {component.finished_at - component.started_at:.2f}s {component.phases}")
+
+    threading.Thread(target=run, name=f"startup-{name}", daemon=True).start()
+    return component
+
+def is_ready(name):
+    """True once the component finished loading (ready or degraded)."""
+    component = components.get(name)
+    return component is not None and component.state in (READY, DEGRADED)
+
+def health_report():
+    """Overall status plus the state and phase timings of every component."""
+    reports = {name: component.report() for name, component in components.items()}
+    states = {report["state"] for report in reports.values()}
+    if states & {PENDING, LOADING}:
+        status = LOADING
+    elif DEGRADED in states:
+        status = DEGRADED
+    else:
+        status = READY
+    return {
+        "status": status,
+        "uptime_s": round(time.monotonic() - PROCESS_STARTED_AT, 3),
+        "components": reports
+    }
@@ -0,0 +1,250 @@
+import os
+import glob
+import json
+import time
+import uuid
+import queue
+import atexit
+import threading
+from datetime import datetime
+from .config import (
+    LOG_FILE, LEGACY_LOG_FILE, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL_SECONDS,
+    LOG_BACKUP_COUNT, LOG_FLUSH_INTERVAL_SECONDS
+)
+from .analytics import RequestAnalyticsStore
+from .session_store import create_session_store
+
+try:
+    import fcntl  # Serializes writers across worker processes (POSIX only)
+except ImportError:
+    fcntl = None
+
+user_sessions = create_session_store() # Expiring per-sender sessions (see SESSION_STORE)
+
+class RequestLogWriter:
+    """
+    Append-only JSON Lines request log.
+
+    log() only enqueues the entry; a background thread appends queued entries in
+    batches, fsyncs them and rotates the file by size or age. Each batch is written
+    with a single O_APPEND write under an exclusive file lock, so concurrent workers
+    never interleave or lose lines, and a crash can at most truncate the last line,
+    which readers skip. Written batches are then handed to each of `sinks`.
+    """
+
+    def __init__(self, path=LOG_FILE, max_bytes=LOG_MAX_BYTES, rotate_interval=LOG_ROTATE_INTERVAL_SECONDS,
+                 backup_count=LOG_BACKUP_COUNT, flush_interval=LOG_FLUSH_INTERVAL_SECONDS, sinks=()):
+        self.path = path
+        self.sinks = list(sinks)
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    def log(self, entry):
+        """Queues an entry for the background writer. Constant time regardless of log size."""
+        self._ensure_worker()
+        self._queue.put(entry)
+
+    def flush(self, entries=None):
+        """Writes every queued entry (plus any already dequeued `entries`) to disk."""
+        with self._flush_lock:
+            entries = entries or []
+            while True:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if entries:
+                self._write(entries)
+                for sink in self.sinks:
+                    try:
+                        sink(entries)
+                    except Exception as e:
+                        print(f"Error forwarding logged requests: {e}")
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+                    self._worker.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            try:
+                self.flush([entry])
+            except Exception as e:
+                print(f"Error logging request: {e}")
+            time.sleep(self.flush_interval)
+
+    def _write(self, entries):
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            # Another process may have rotated the file between open() and flock().
+            if not os.path.exists(self.path) or not os.path.samestat(os.fstat(fd), os.stat(self.path)):
+                os.close(fd)
+                return self._write(entries)
+            os.write(fd, data)
+            os.fsync(fd)
+            self._maybe_rotate(fd)
+        finally:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _maybe_rotate(self, fd):
+        """Rotates the current file (whose lock is held) once it is too big or too old."""
+        size = os.fstat(fd).st_size
+        if size < self.max_bytes and self._file_age(self.path) < self.rotate_interval:
+            return
+        rotated_path = f"{self.path}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        os.rename(self.path, rotated_path)
+        rotated_files = get_log_files(self.path)
+        for old_path in rotated_files[:max(0, len(rotated_files) - self.backup_count)]:
+            os.remove(old_path)
+
+    @staticmethod
+    def _file_age(path):
+        """Seconds since the first entry of the file was written."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                first_entry = json.loads(f.readline())
+            return (datetime.now() - datetime.fromisoformat(first_entry["timestamp"])).total_seconds()
+        except (OSError, ValueError, KeyError):
+            return 0
+
+def get_log_files(path=LOG_FILE):
+    """Returns the rotated log files, oldest first, followed by the current one."""
+    files = sorted(name for name in glob.glob(f"{glob.escape(path)}.*") if ".tmp-" not in name)
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+def iter_log_entries(path=LOG_FILE):
+    """Yields every logged entry, oldest first, skipping truncated or corrupt lines."""
+    for log_path in get_log_files(path):
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+def migrate_legacy_log(legacy_path=LEGACY_LOG_FILE, path=LOG_FILE):
+    """Converts the old JSON-array log into a rotated JSON Lines file, once."""
+    if not os.path.exists(legacy_path):
+        return
+    try:
+        with open(legacy_path, 'r') as f:
+            data = json.load(f) if os.path.getsize(legacy_path) > 0 else []
+        if not isinstance(data, list):
+            data = []
+        migrated_path = f"{path}.00000000-000000-migrated"
+        tmp_path = f"{migrated_path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in data:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, migrated_path)
+        os.rename(legacy_path, f"{legacy_path}.migrated")
+        print(f"Migrated {len(data)} entries from '{legacy_path}' to '{migrated_path}'.")
+    except FileNotFoundError:
+        pass  # Already migrated by another worker
+    except Exception as e:
+        print(f"Error migrating legacy log file '{legacy_path}': {e}")
+
+def backfill_analytics(store):
+    """Imports the existing JSON Lines log into a newly created analytics store."""
+    try:
+        imported = store.backfill(iter_log_entries())
+        if imported:
+            print(f"Imported {imported} logged requests into the analytics store.")
+    except Exception as e:
+        print(f"Error importing the request log into the analytics store: {e}")
+
+migrate_legacy_log()
+analytics_store = RequestAnalyticsStore()
+request_logger = RequestLogWriter(sinks=[analytics_store.add_entries])
+threading.Thread(target=backfill_analytics, args=(analytics_store,), name="analytics-backfill", daemon=True).start()
+
+def format_sse(payload):
+    """Formats a JSON payload as one Server-Sent Events message."""
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def log_request(sender_id, question, answer, category="General", employee_id=None):
+    """Logs each request to the append-only JSON Lines log."""
+    log_entry = {
+        "request_id": uuid.uuid4().hex,
+        "timestamp": datetime.now().isoformat(),
+        "sender_id": sender_id,
+        "employee_id": employee_id,
+        "question": question,
+        "answer": answer,
+        "category": category
+    }
+    try:
+        request_logger.log(log_entry)
+    except Exception as e:
+        print(f"Error logging request: {e}")
+
+def get_request_history(sender_id, limit=None, offset=0):
+    """Retrieves the request history for a specific sender."""
+    history = []
+    try:
+        request_logger.flush()
+        history = analytics_store.get_request_history(sender_id, limit, offset)
+    except Exception as e:
+        print(f"Error reading request history: {e}")
+    return history
+
+def get_employee_history(employee_id, page=1, page_size=50):
+    """Retrieves one page of an employee's request history, newest first."""
+    history = []
+    try:
+        request_logger.flush()
+        history = analytics_store.get_employee_history(employee_id, page, page_size)
+    except Exception as e:
+        print(f"Error reading employee history: {e}")
+    return history
+
+def count_requests_by_category():
+    """Counts requests by category."""
+    category_counts = {}
+    try:
+        request_logger.flush()
+        category_counts = analytics_store.count_requests_by_category()
+    except Exception as e:
+        print(f"Error counting requests by category: {e}")
+    return category_counts
+
+def count_requests_in_window(start, end=None):
+    """Counts requests by category within a time window (hour granularity)."""
+    category_counts = {}
+    try:
+        request_logger.flush()
+        category_counts = analytics_store.count_requests_in_window(start, end)
+    except Exception as e:
+        print(f"Error counting requests in time window: {e}")
+    return category_counts
+
+def get_top_unanswered_questions(n=10, since=None):
+    """Returns the most frequent questions that ended in a referral."""
+    questions = []
+    try:
+        request_logger.flush()
+        questions = analytics_store.top_unanswered_questions(n, since)
+    except Exception as e:
+        print(f"Error reading unanswered questions: {e}")
+    return questions
@@ -0,0 +1,53 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
+MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", "32"))        # Requests processed at once
+MAX_QUEUE_DEPTH = int(os.getenv("CHAT_MAX_QUEUE_DEPTH", "64"))    # Requests waiting for a slot
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("CHAT_QUEUE_TIMEOUT_SECONDS", "10"))
+
+class Overloaded(Exception):
+    """The request was shed: the queue is full or no slot freed up in time."""
+
+class AdmissionController:
+    """
+    Lets max_in_flight requests run and max_queue_depth wait. Further requests, and
+    requests waiting longer than queue_timeout seconds, are rejected with Overloaded
+    so the service answers 503 quickly instead of piling up work it cannot finish.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_queue_depth=MAX_QUEUE_DEPTH,
+                 queue_timeout=QUEUE_TIMEOUT_SECONDS):
+        self.max_in_flight = max_in_flight
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.in_flight >= self.max_in_flight and self.waiting >= self.max_queue_depth:
+            self.shed += 1
+            raise Overloaded("Too many requests waiting")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise Overloaded(f"No free slot within {self.queue_timeout}s")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "waiting": self.waiting, "admitted": self.admitted, "shed": self.shed,
+                "max_in_flight": self.max_in_flight, "max_queue_depth": self.max_queue_depth}
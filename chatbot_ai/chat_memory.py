@@ -1,4 +1,122 @@
-from langchain.memory import ConversationBufferMemory
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from langchain.memory import ConversationTokenBufferMemory, ConversationSummaryBufferMemory
 
-def get_memory():
-    return ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+MEMORY_TYPE = "window"             # "window": latest turns within the budget; "summary": older turns summarized
+MEMORY_MAX_TOKENS = 1000           # History tokens sent with each question, per session
+SESSION_TTL_SECONDS = 30 * 60      # Idle sessions are dropped after this
+MAX_SESSIONS = 10000
+MAX_TOTAL_MEMORY_TOKENS = 2000000  # History kept across all sessions before the least recent are evicted
+
+def get_memory(llm, memory_type=MEMORY_TYPE, max_tokens=MEMORY_MAX_TOKENS):
+    """Conversation memory bounded to max_tokens; `llm` counts tokens (and writes summaries)."""
+    memory_class = ConversationSummaryBufferMemory if memory_type == "summary" else ConversationTokenBufferMemory
+    return memory_class(llm=llm, max_token_limit=max_tokens, memory_key="chat_history", return_messages=True)
+
+def memory_tokens(memory):
+    """Tokens held by a memory: its buffered messages plus its running summary, if any."""
+    messages = memory.chat_memory.messages
+    tokens = memory.llm.get_num_tokens_from_messages(messages) if messages else 0
+    summary = getattr(memory, "moving_summary_buffer", "")
+    return tokens + (memory.llm.get_num_tokens(summary) if summary else 0)
+
+class Session:
+    def __init__(self, memory):
+        self.memory = memory
+        self.lock = asyncio.Lock()  # One request per session at a time, so turns stay in order
+        self.last_used = time.monotonic()
+        self.tokens = 0
+        self.active = 0  # Requests holding or waiting for the lock; such sessions are never dropped
+
+class SessionMemoryStore:
+    """
+    Per-session memories in an LRU. Sessions idle for ttl_seconds expire, and the least
+    recently used are evicted beyond max_sessions or max_total_tokens of history. Sessions
+    with a request in flight are skipped, so a session id never has two live Session objects.
+    """
+
+    def __init__(self, memory_factory, max_sessions=MAX_SESSIONS, ttl_seconds=SESSION_TTL_SECONDS,
+                 max_total_tokens=MAX_TOTAL_MEMORY_TOKENS):
+        self.memory_factory = memory_factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_total_tokens = max_total_tokens
+        self.total_tokens = 0
+        self.evicted = 0
+        self.expired = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def session(self, session_id):
+        """Yields the session's memory, held exclusively until the block ends."""
+        session = self._get(session_id)
+        try:
+            async with session.lock:
+                try:
+                    yield session.memory
+                finally:
+                    self._update_tokens(session)
+        finally:
+            with self._lock:
+                session.active -= 1
+
+    def _get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(self.memory_factory())
+            else:
+                self._sessions.move_to_end(session_id)
+            session.active += 1
+            session.last_used = now
+            self._evict()
+            return session
+
+    def _update_tokens(self, session):
+        tokens = memory_tokens(session.memory)
+        with self._lock:  # The session is active, so still in the store
+            self.total_tokens += tokens - session.tokens
+            session.tokens = tokens
+            self._evict()
+
+    def _remove(self, session_id):
+        self.total_tokens -= self._sessions.pop(session_id).tokens
+
+    def _expire(self, now):
+        # The LRU order is also the last-used order, so expired sessions are at the front.
+        expired = []
+        for session_id, session in self._sessions.items():
+            if now - session.last_used < self.ttl_seconds:
+                break
+            if not session.active:
+                expired.append(session_id)
+        for session_id in expired:
+            self._remove(session_id)
+            self.expired += 1
+
+    def _evict(self):
+        excess_sessions = len(self._sessions) - self.max_sessions
+        excess_tokens = self.total_tokens - self.max_total_tokens
+        evicted = []
+        for session_id, session in self._sessions.items():
+            if excess_sessions <= 0 and excess_tokens <= 0:
+                break
+            if session.active:
+                continue
+            evicted.append(session_id)
+            excess_sessions -= 1
+            excess_tokens -= session.tokens
+        for session_id in evicted:
+            self._remove(session_id)
+            self.evicted += 1
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "total_tokens": self.total_tokens,
+                    "evicted": self.evicted, "expired": self.expired}
@@ -1,18 +1,20 @@
 from langchain.chains import ConversationalRetrievalChain
 from langchain.chat_models import ChatOpenAI
 
-from chat_memory import get_memory
 from document_loader import load_and_index_documents
 
-def get_chain():
+def get_llm():
+    return ChatOpenAI(model_name="gpt-3.5-turbo")
+
+def get_chain(llm):
+    """
+    Retrieval chain without memory of its own: callers pass each session's
+    `chat_history` (see chat_memory.SessionMemoryStore).
+    """
     retriever = load_and_index_documents().as_retriever()
-    memory = get_memory()
-    
-    llm = ChatOpenAI(model_name="gpt-3.5-turbo")
-    
+
     qa_chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
-        retriever=retriever,
-        memory=memory
+        retriever=retriever
     )
     return qa_chain
@@ -1,20 +1,120 @@
 import os
-from langchain.document_loaders import PyPDFLoader
+import json
+import hashlib
+import argparse
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.embeddings import OpenAIEmbeddings
 from langchain.vectorstores import FAISS
+from ingestion import IngestionPipeline
 
-def load_and_index_documents(folder_path='documents'):
-    docs = []
-    for file in os.listdir(folder_path):
-        if file.endswith(".pdf"):
-            loader = PyPDFLoader(os.path.join(folder_path, file))
-            docs.extend(loader.load())
-    
-    splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = splitter.split_documents(docs)
-    
+INDEX_DIR = "faiss_index"          # Saved vector store and manifest
+MANIFEST_FILE = "manifest.json"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def scan_folder(folder_path, previous):
+    """
+    Returns the manifest entries of the PDFs in the folder and the names of the new or
+    modified ones. Files whose size and mtime are unchanged are not re-hashed.
+    """
+    entries, changed = {}, []
+    for file in sorted(os.listdir(folder_path)):
+        if not file.endswith(".pdf"):
+            continue
+        path = os.path.join(folder_path, file)
+        stat = os.stat(path)
+        old = previous.get(file)
+        if old and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime:
+            entries[file] = old
+            continue
+        digest = file_hash(path)
+        if old and old["sha256"] == digest:
+            entries[file] = {**old, "mtime": stat.st_mtime}  # Touched, not modified
+            continue
+        entries[file] = {"path": path, "size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest, "ids": []}
+        changed.append(file)
+    return entries, changed
+
+def load_manifest(index_dir):
+    try:
+        with open(os.path.join(index_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_store(db, manifest, index_dir):
+    """Saves the store, then the manifest (atomically), so a manifest never lists unsaved chunks."""
+    db.save_local(index_dir)
+    tmp_path = os.path.join(index_dir, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(index_dir, MANIFEST_FILE))
+
+def load_store(index_dir, embeddings, manifest):
+    """Loads the saved store if it matches the manifest; returns None otherwise."""
+    try:
+        try:
+            db = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+        except TypeError:
+            db = FAISS.load_local(index_dir, embeddings)  # Older langchain without the flag
+    except Exception as e:
+        print(f"Could not load the saved vector store, rebuilding it: {e}")
+        return None
+    expected = {chunk_id for entry in manifest["files"].values() for chunk_id in entry["ids"]}
+    if set(db.index_to_docstore_id.values()) != expected:
+        print("Saved vector store does not match its manifest, rebuilding it.")
+        return None
+    return db
+
+def load_and_index_documents(folder_path='documents', index_dir=INDEX_DIR):
+    """
+    Returns a FAISS store of the PDFs in folder_path, kept on disk in index_dir.
+    Only new or modified PDFs are ingested (see ingestion.py); chunks of deleted or
+    modified PDFs are removed from the store.
+    """
     embeddings = OpenAIEmbeddings()
-    db = FAISS.from_documents(chunks, embeddings)
-    
+    settings = {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP,
+                "embedding_model": getattr(embeddings, "model", None)}
+
+    manifest = load_manifest(index_dir)
+    db = None
+    if manifest and manifest.get("settings") == settings:
+        db = load_store(index_dir, embeddings, manifest)
+    previous = manifest["files"] if db is not None else {}
+
+    files, changed = scan_folder(folder_path, previous)
+    removed = [file for file in previous if file not in files]
+    stale_ids = [chunk_id for file in removed + changed for chunk_id in previous.get(file, {}).get("ids", [])]
+    if db is not None and stale_ids:
+        db.delete(stale_ids)
+
+    if changed:
+        splitter = CharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        pipeline = IngestionPipeline(embeddings, splitter, db)
+        db, ids_by_file, failed = pipeline.run({file: files[file]["path"] for file in changed})
+        for file in changed:
+            files[file]["ids"] = ids_by_file.get(file, [])
+        for file in failed:
+            del files[file]  # Not in the manifest, so it is retried on the next run
+
+    if db is None:
+        raise ValueError(f"No PDF text to index in '{folder_path}'.")
+    print(f"Indexed {len(files)} PDFs: {len(changed)} new or modified, {len(removed)} removed, "
+          f"{sum(file not in changed for file in files)} reused.")
+    if changed or removed or files != previous:
+        save_store(db, {"settings": settings, "files": files}, index_dir)
     return db
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Indexes (or updates the index of) a folder of PDFs.")
+    parser.add_argument("folder", nargs="?", default="documents")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    args = parser.parse_args()
+    load_and_index_documents(args.folder, args.index_dir)
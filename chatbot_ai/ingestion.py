@@ -0,0 +1,192 @@
+"""
+Streaming ingestion of PDFs into a FAISS store.
+
+    PDF paths -> process pool (parse) -> splitter (generator) -> bounded queue
+              -> embedding threads (batched) -> bounded queue -> inserter thread
+
+At most PARSE_WORKERS * 2 parsed PDFs and QUEUE_SIZE chunk batches per queue are held
+at once, so memory follows the batch and window sizes, not the size of the corpus.
+"""
+import os
+import time
+import uuid
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from langchain.document_loaders import PyPDFLoader
+from langchain.vectorstores import FAISS
+
+PARSE_WORKERS = os.cpu_count() or 2
+EMBED_BATCH_SIZE = 64              # Chunks per embedding request
+EMBED_CONCURRENCY = 4              # Embedding requests in flight
+QUEUE_SIZE = 8                     # Batches waiting between two stages
+PROGRESS_INTERVAL_SECONDS = 5
+
+_DONE = object()
+
+def parse_pdf(path):
+    """Runs in a worker process: the pages of one PDF as Documents."""
+    return PyPDFLoader(path).load()
+
+def iter_parsed(paths, workers, progress, failed):
+    """
+    Parses the PDFs of `paths` (name -> path) in a process pool and yields (name, pages)
+    as they finish. Only workers * 2 PDFs are submitted at a time. Names of PDFs that
+    fail to parse are appended to `failed`.
+    """
+    items = iter(paths.items())
+    with ProcessPoolExecutor(workers) as pool:
+        pending = {}
+        while True:
+            for name, path in items:
+                pending[pool.submit(parse_pdf, path)] = name
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    print(f"Error parsing {name}, skipping it: {e}")
+                    failed.append(name)
+                    continue
+                progress.add(files=1, pages=len(pages))
+                yield name, pages
+
+def iter_chunk_batches(parsed, splitter, batch_size):
+    """Splits the parsed pages one at a time and yields lists of batch_size (name, chunk) pairs."""
+    batch = []
+    for name, pages in parsed:
+        for page in pages:
+            for chunk in splitter.split_documents([page]):
+                batch.append((name, chunk))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+class IngestionProgress:
+    """Thread-safe counters of the pipeline, printed every PROGRESS_INTERVAL_SECONDS."""
+
+    def __init__(self, total_files):
+        self.total_files = total_files
+        self.counts = {"files": 0, "pages": 0, "chunks": 0, "embedded": 0, "inserted": 0}
+        self.busy = {"embed": 0.0, "insert": 0.0}  # Seconds spent in each stage
+        self.start = time.perf_counter()
+        self._last_print = self.start
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.counts[key] += value
+
+    def add_busy(self, stage, seconds):
+        with self._lock:
+            self.busy[stage] += seconds
+
+    def maybe_print(self):
+        now = time.perf_counter()
+        if now - self._last_print >= PROGRESS_INTERVAL_SECONDS:
+            self._last_print = now
+            print(self.report())
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        c = self.counts
+        return (f"[ingest {elapsed:.0f}s] files {c['files']}/{self.total_files} ({c['files'] / elapsed:.1f}/s), "
+                f"pages {c['pages']}, chunks split {c['chunks']}, embedded {c['embedded']}, "
+                f"inserted {c['inserted']} ({c['inserted'] / elapsed:.1f}/s), "
+                f"embed busy {self.busy['embed']:.1f}s, insert busy {self.busy['insert']:.1f}s")
+
+class IngestionPipeline:
+    """Parses, splits, embeds and inserts PDFs into `db` (created on the first batch when None)."""
+
+    def __init__(self, embeddings, splitter, db=None, parse_workers=PARSE_WORKERS,
+                 batch_size=EMBED_BATCH_SIZE, embed_concurrency=EMBED_CONCURRENCY, queue_size=QUEUE_SIZE):
+        self.embeddings = embeddings
+        self.splitter = splitter
+        self.db = db
+        self.parse_workers = parse_workers
+        self.batch_size = batch_size
+        self.embed_concurrency = embed_concurrency
+        self.embed_queue = queue.Queue(maxsize=queue_size)
+        self.insert_queue = queue.Queue(maxsize=queue_size)
+        self.ids_by_file = {}
+        self.error = None
+
+    def run(self, paths):
+        """
+        Ingests `paths` (name -> PDF path). Returns the store, the chunk ids added for
+        every name and the names that failed to parse. Embedding errors are raised.
+        """
+        progress = IngestionProgress(len(paths))
+        failed = []
+        workers = [threading.Thread(target=self._embed_worker, args=(progress,), daemon=True)
+                   for _ in range(self.embed_concurrency)]
+        inserter = threading.Thread(target=self._insert_worker, args=(progress,), daemon=True)
+        for thread in workers + [inserter]:
+            thread.start()
+        try:
+            parsed = iter_parsed(paths, self.parse_workers, progress, failed)
+            for batch in iter_chunk_batches(parsed, self.splitter, self.batch_size):
+                if self.error:
+                    break
+                progress.add(chunks=len(batch))
+                self.embed_queue.put(batch)  # Blocks while the embedders are behind
+        finally:
+            for _ in workers:
+                self.embed_queue.put(_DONE)
+            for thread in workers:
+                thread.join()
+            self.insert_queue.put(_DONE)
+            inserter.join()
+        if self.error:
+            raise self.error
+        print(progress.report())
+        return self.db, self.ids_by_file, failed
+
+    def _embed_worker(self, progress):
+        while True:
+            batch = self.embed_queue.get()
+            if batch is _DONE:
+                return
+            if self.error:
+                continue  # Drain so the producer never blocks
+            try:
+                start = time.perf_counter()
+                vectors = self.embeddings.embed_documents([chunk.page_content for _, chunk in batch])
+                progress.add_busy("embed", time.perf_counter() - start)
+                progress.add(embedded=len(batch))
+                self.insert_queue.put((batch, vectors))
+            except Exception as e:
+                self.error = e
+
+    def _insert_worker(self, progress):
+        while True:
+            item = self.insert_queue.get()
+            if item is _DONE:
+                return
+            if self.error:
+                continue
+            batch, vectors = item
+            try:
+                start = time.perf_counter()
+                ids = [str(uuid.uuid4()) for _ in batch]
+                text_embeddings = [(chunk.page_content, vector) for (_, chunk), vector in zip(batch, vectors)]
+                metadatas = [chunk.metadata for _, chunk in batch]
+                if self.db is None:
+                    self.db = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=ids)
+                else:
+                    self.db.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+                for (name, _), chunk_id in zip(batch, ids):
+                    self.ids_by_file.setdefault(name, []).append(chunk_id)
+                progress.add_busy("insert", time.perf_counter() - start)
+                progress.add(inserted=len(batch))
+                progress.maybe_print()
+            except Exception as e:
+                self.error = e
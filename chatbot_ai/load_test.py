@@ -0,0 +1,74 @@
+"""
+Load test for the /chat endpoint: for every concurrency level, that many clients send
+questions back to back and the run reports throughput, p50/p99 latency and how many
+requests were shed with 503.
+
+Against the mock API (no OpenAI costs), with at least one PDF in documents/:
+    python mock_openai_server.py --port 8081 --latency 0.3 &
+    OPENAI_API_BASE=http://127.0.0.1:8081/v1 OPENAI_BASE_URL=http://127.0.0.1:8081/v1 uvicorn main:app --port 8000 &
+    python load_test.py --url http://127.0.0.1:8000 --concurrency 1,8,32,64,128 --requests 200
+"""
+import time
+import asyncio
+import argparse
+from collections import Counter
+import httpx
+
+QUESTIONS = [
+    "What does the document say about the return policy?",
+    "Summarize the main points of section 2.",
+    "Who should I contact for support?",
+    "And what are the deadlines?"
+]
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+async def run_level(client, url, concurrency, total_requests):
+    latencies, outcomes = [], Counter()
+    remaining = iter(range(total_requests))
+
+    async def user(user_id):
+        session_id = None
+        for i in remaining:
+            payload = {"question": QUESTIONS[i % len(QUESTIONS)], "session_id": session_id}
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/chat", json=payload)
+            except httpx.HTTPError as e:
+                outcomes[type(e).__name__] += 1
+                continue
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+                session_id = response.json()["session_id"]
+                outcomes["ok"] += 1
+            else:
+                outcomes[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(u) for u in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"concurrency": concurrency, "elapsed": elapsed, "throughput": outcomes["ok"] / elapsed,
+            "p50": percentile(latencies, 0.5), "p99": percentile(latencies, 0.99), "outcomes": dict(outcomes)}
+
+async def main(args):
+    levels = [int(level) for level in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}  outcomes")
+        for concurrency in levels:
+            r = await run_level(client, args.url.rstrip("/"), concurrency, args.requests)
+            print(f"{r['concurrency']:>5} {r['throughput']:>8.1f} {r['p50'] * 1000:>8.0f} {r['p99'] * 1000:>8.0f}  {r['outcomes']}")
+        stats = await client.get(f"{args.url.rstrip('/')}/admission/stats")
+        print(f"admission: {stats.json()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-tests the /chat endpoint at increasing concurrency.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", default="1,8,32,64", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per level.")
+    parser.add_argument("--timeout", type=float, default=60)
+    asyncio.run(main(parser.parse_args()))
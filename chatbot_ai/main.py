@@ -1,17 +1,46 @@
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from chatbot_agent import get_chain
+from typing import Optional
+from chatbot_agent import get_llm, get_chain
+from chat_memory import get_memory, SessionMemoryStore
+from admission import AdmissionController, Overloaded
 import os
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
 app = FastAPI()
-qa_chain = get_chain()
+# Built once, so every request shares the same OpenAI clients and connection pools.
+llm = get_llm()
+qa_chain = get_chain(llm)
+sessions = SessionMemoryStore(lambda: get_memory(llm))
+admission = AdmissionController()
 
 class ChatRequest(BaseModel):
     question: str
+    session_id: Optional[str] = None  # Omit to start a new conversation
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 @app.post("/chat")
-def chat(request: ChatRequest):
-    response = qa_chain.run(request.question)
-    return {"response": response}
+async def chat(request: ChatRequest):
+    session_id = request.session_id or str(uuid.uuid4())
+    async with admission.slot():
+        async with sessions.session(session_id) as memory:
+            history = memory.load_memory_variables({})["chat_history"]
+            response = await qa_chain.arun(question=request.question, chat_history=history)
+            # A summary memory may call the LLM to compress old turns; keep that off the event loop.
+            await run_in_threadpool(memory.save_context, {"input": request.question}, {"output": response})
+    return {"response": response, "session_id": session_id}
+
+@app.get("/sessions/stats")
+def sessions_stats():
+    return sessions.stats()
+
+@app.get("/admission/stats")
+def admission_stats():
+    return admission.stats()
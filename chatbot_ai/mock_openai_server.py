@@ -0,0 +1,91 @@
+"""
+Local mock of the OpenAI chat completions and embeddings APIs, so the chatbot can be
+load-tested without calling (or paying for) the real API.
+
+Usage:
+    python mock_openai_server.py --port 8081 --latency 0.3
+    OPENAI_API_BASE=http://127.0.0.1:8081/v1 OPENAI_BASE_URL=http://127.0.0.1:8081/v1 uvicorn main:app
+"""
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+from array import array
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ANSWER = "According to the documents, the requested information is in section 2."
+EMBEDDING_DIMENSIONS = 1536
+
+def fake_embedding(text):
+    """Deterministic vector derived from the text, so equal texts embed equally."""
+    seed = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(seed[i % len(seed)] - 128) / 128 for i in range(EMBEDDING_DIMENSIONS)]
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    latency = 0.0
+    embedding_latency = 0.0
+    stats = {"chat": 0, "embeddings": 0}
+    stats_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet under load
+
+    def do_GET(self):
+        if self.path != "/stats":
+            return self._send_json(404, {"error": {"message": "Not found"}})
+        with self.stats_lock:
+            self._send_json(200, dict(self.stats))
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/chat/completions"):
+            self._count("chat")
+            time.sleep(self.latency)
+            return self._send_json(200, {
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            })
+        if self.path.endswith("/embeddings"):
+            self._count("embeddings")
+            time.sleep(self.embedding_latency)
+            inputs = body.get("input", [])
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+            encode = (lambda vector: vector) if body.get("encoding_format") != "base64" else \
+                (lambda vector: base64.b64encode(array("f", vector).tobytes()).decode("ascii"))
+            return self._send_json(200, {
+                "object": "list", "model": body.get("model"),
+                "data": [{"object": "embedding", "index": i, "embedding": encode(fake_embedding(str(text)))}
+                         for i, text in enumerate(inputs)],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0}
+            })
+        self._send_json(404, {"error": {"message": "Not found"}})
+
+    def _count(self, kind):
+        with self.stats_lock:
+            self.stats[kind] += 1
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat completions and embeddings server.")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before every chat completion.")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Seconds before every embeddings response.")
+    args = parser.parse_args()
+
+    MockOpenAIHandler.latency = args.latency
+    MockOpenAIHandler.embedding_latency = args.embedding_latency
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockOpenAIHandler)
+    print(f"Mock OpenAI API on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()